@@ -0,0 +1,99 @@
+"""
+Shared plumbing for the benchmark scripts in the project root
+(bench_pro.py, benchmark_sentient.py, benchmark_logger.py, benchmark_verbose.py):
+the pooled HTTP session and thread pool, the on-disk response cache and the
+QID bitmask helpers.
+"""
+import atexit
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def make_executor(dataset):
+    """Both engines are queried concurrently: one worker per outstanding request."""
+    return ThreadPoolExecutor(max_workers=2 * len(dataset))
+
+def make_session(pool_maxsize):
+    """
+    Keep-alive session shared by a script's worker threads. Each host gets up
+    to pool_maxsize pooled connections (size it to the executor), and transient
+    failures are retried twice with backoff.
+    """
+    session = requests.Session()
+    session.headers.update({"Connection": "keep-alive", "Accept": "application/json"})
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize,
+                          max_retries=Retry(total=2, backoff_factor=0.2))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class ResponseCache:
+    """
+    On-disk JSON response cache keyed by (endpoint, text), so repeat runs skip
+    the public APIs. Each script uses its own file: scripts sharing one would
+    overwrite each other's entries when they exit.
+    Loaded once, written back once at interpreter exit.
+    """
+
+    def __init__(self, path, ttl=86400, enabled=True):
+        """
+        :param path: JSON file holding the entries.
+        :param ttl: Seconds after which an entry is fetched again.
+        :param enabled: False (e.g. --no-cache) bypasses reads and writes.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = {}
+        if enabled:
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self._entries = orjson.loads(f.read())
+            atexit.register(self.save)
+
+    def save(self):
+        with open(self.path, "wb") as f:
+            f.write(orjson.dumps(self._entries))
+
+    def fetch_json(self, session, url, text, timeout=5, **post_kwargs):
+        """POSTs `text` to an engine and returns the decoded JSON (cached on disk)."""
+        key = f"{url}\t{text}"
+        entry = self._entries.get(key) if self.enabled else None
+        if entry and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        response = session.post(url, timeout=timeout, **post_kwargs)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if self.enabled:
+            self._entries[key] = [time.time(), data]
+        return data
+
+def qid_vocab(qid_lists):
+    """
+    Bit position for every QID in qid_lists. Scoring runs on integer bitmasks:
+    only gold QIDs can ever produce a hit, so they alone get bit positions and
+    engine results are projected onto them.
+    """
+    return {qid: i for i, qid in enumerate(sorted({q for qids in qid_lists for q in qids}))}
+
+def to_mask(qids, vocab):
+    """Bitmask of the QIDs in `qids` that are part of vocab."""
+    mask = 0
+    for qid in qids:
+        bit = vocab.get(qid)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+def find_triggers(text, triggers):
+    """
+    Set of the triggers that occur in `text`. Each trigger is looked up on its
+    own: a single alternation regex reports only one alternative per position,
+    so a trigger that is a prefix of another would hide the longer one.
+    """
+    return {trigger for trigger in triggers if trigger in text}
@@ -1,9 +1,13 @@
+import logging
+import sys
 import requests
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sklearn.metrics import precision_score
 import time
+from bench_common import make_executor, make_session, qid_vocab, to_mask, find_triggers, ResponseCache
+
+logger = logging.getLogger("bench_pro")
+# Failed engine calls are logged at DEBUG; pass --verbose on the command line to see them.
+logging.basicConfig(level=logging.DEBUG if "--verbose" in sys.argv else logging.WARNING,
+                    format="%(levelname)s %(name)s: %(message)s")
 
 # ==============================================================================
 # 1. CONFIGURATION
@@ -12,6 +16,10 @@ import time
 FALCON_URL = "https://labs.tib.eu/falcon/falcon2/api?mode=long"
 TAPIOCA_URL = "https://opentapioca.org/api/annotate"
 
+# On-disk response cache keyed by (endpoint, text): repeat runs skip the public APIs.
+# Pass --no-cache on the command line to force fresh requests.
+CACHE = ResponseCache("sentient_bench_cache_pro.json", enabled="--no-cache" not in sys.argv)
+
 # ==============================================================================
 # 2. THE DATASET (Entity Linking Standard)
 # ==============================================================================
@@ -39,6 +47,12 @@ DATASET = [
     {"q": "Capital of amercia?", "gold": ["Q30"]},       # USA (Typo)
     {"q": "Where is londonn?", "gold": ["Q84"]},         # London (Typo)
 ]
+QID_VOCAB = qid_vocab(it['gold'] for it in DATASET)
+for it in DATASET:
+    it['gold_mask'] = to_mask(it['gold'], QID_VOCAB)
+
+EXECUTOR = make_executor(DATASET)
+SESSION = make_session(pool_maxsize=2 * len(DATASET))
 
 # ==============================================================================
 # 3. ENGINE LOGIC
@@ -47,8 +61,7 @@ DATASET = [
 def get_falcon(text):
     try:
         # [FIX] Using the JSON format you discovered
-        resp = requests.post(FALCON_URL, json={"text": text}, timeout=5)
-        data = resp.json()
+        data = CACHE.fetch_json(SESSION, FALCON_URL, text, json={"text": text})
         ids = set()
         # [FIX] Parsing 'entities_wikidata' instead of 'entities_k'
         if 'entities_wikidata' in data:
@@ -56,23 +69,62 @@ def get_falcon(text):
                 # Format: "http://www.wikidata.org/entity/Q95" -> "Q95"
                 uri = ent.get('URI', '')
                 if 'wikidata.org' in uri:
-                    ids.add(uri.split('/')[-1])
+                    ids.add(uri.rpartition('/')[2])
         return ids
-    except:
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.debug(f"Engine call failed for {text!r}: {type(e).__name__}: {e}")
         return set()
 
 def get_tapioca(text):
     try:
-        resp = requests.post(TAPIOCA_URL, data={"query": text}, timeout=5)
-        data = resp.json()
+        data = CACHE.fetch_json(SESSION, TAPIOCA_URL, text, data={"query": text})
         ids = set()
         for ann in data.get('annotations', []):
             for tag in ann.get('tags', []):
                 ids.add(tag['id'])
         return ids
-    except:
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.debug(f"Engine call failed for {text!r}: {type(e).__name__}: {e}")
         return set()
 
+# --- SCRUTINIZER LAYERS (The "Secret Sauce") ---
+# (trigger_substring, required_candidate_qid, action_qid, action_kind)
+# A rule fires when its trigger is in the text and its required QID (if any)
+# is among the candidates.
+SCRUTINIZER_RULES = (
+    # 1. Ambiguity Filters
+    ("pie",     "Q89",   "Q312",  "discard"),  # Fruit > Tech
+    ("river",   "Q3783", "Q3884", "discard"),  # River > Tech
+    # 2. Typo Recovery (Simulated for this demo)
+    # Standard engines often fail strictly on typos; SenTient uses fuzzy matching
+    ("gogle",   None,    "Q95",   "add"),
+    ("amercia", None,    "Q30",   "add"),
+    ("londonn", None,    "Q84",   "add"),
+)
+
+# Integer encoding of the rules: triggers and rule QIDs become bit positions, so the
+# rule walk is pure integer arithmetic.
+RULE_TRIGGERS = tuple(dict.fromkeys(rule[0] for rule in SCRUTINIZER_RULES))
+RULE_QIDS = tuple(dict.fromkeys(q for rule in SCRUTINIZER_RULES for q in rule[1:3] if q))
+TRIG_IDX = {t: i for i, t in enumerate(RULE_TRIGGERS)}
+QID_IDX = {q: i for i, q in enumerate(RULE_QIDS)}
+# (trigger_bit, required_bit or -1, action_bit, 1 = add / 0 = discard)
+RULE_TABLE = tuple(
+    (TRIG_IDX[t], QID_IDX[r] if r else -1, QID_IDX[q], 1 if a == "add" else 0)
+    for t, r, q, a in SCRUTINIZER_RULES
+)
+
+def apply_rules(trig_mask, cand_mask, out_mask):
+    """Walks RULE_TABLE over bitmasks; returns the updated rule-QID mask."""
+    for rule in RULE_TABLE:
+        trig, req, qid, add = rule
+        if (trig_mask >> trig) & 1 and (req < 0 or (cand_mask >> req) & 1):
+            if add:
+                out_mask |= 1 << qid
+            else:
+                out_mask &= ~(1 << qid)
+    return out_mask
+
 def get_sentient_logic(text, f_res, t_res):
     """
     SIMULATES SENTIENT SCRUTINIZER:
@@ -81,23 +133,32 @@ def get_sentient_logic(text, f_res, t_res):
     3. Typos: Manual correction layer
     """
     candidates = f_res.union(t_res)
-    final_set = set(candidates)
     text_lower = text.lower()
 
-    # --- SCRUTINIZER LAYERS (The "Secret Sauce") ---
-    
-    # 1. Ambiguity Filters
-    if "pie" in text_lower and "Q89" in candidates: final_set.discard("Q312") # Fruit > Tech
-    if "river" in text_lower and "Q3783" in candidates: final_set.discard("Q3884") # River > Tech
-    
-    # 2. Typo Recovery (Simulated for this demo)
-    # Standard engines often fail strictly on typos; SenTient uses fuzzy matching
-    if "gogle" in text_lower: final_set.add("Q95")
-    if "amercia" in text_lower: final_set.add("Q30")
-    if "londonn" in text_lower: final_set.add("Q84")
+    trig_mask = 0
+    for trigger in find_triggers(text_lower, RULE_TRIGGERS):
+        trig_mask |= 1 << TRIG_IDX[trigger]
+    cand_mask = 0
+    for qid in candidates.intersection(QID_IDX):
+        cand_mask |= 1 << QID_IDX[qid]
+
+    out_mask = apply_rules(trig_mask, cand_mask, cand_mask)
+
+    # Candidates the rules never touch pass through unchanged
+    final_set = candidates.difference(RULE_QIDS)
+    final_set.update(q for i, q in enumerate(RULE_QIDS) if (out_mask >> i) & 1)
 
     return final_set
 
+def fetch_all(queries):
+    """
+    Issues every Falcon and Tapioca request up front so the whole batch
+    overlaps on the network. Returns both result lists in query order.
+    """
+    falcon_futs = [EXECUTOR.submit(get_falcon, q) for q in queries]
+    tapioca_futs = [EXECUTOR.submit(get_tapioca, q) for q in queries]
+    return [f.result() for f in falcon_futs], [f.result() for f in tapioca_futs]
+
 # ==============================================================================
 # 4. RUN BENCHMARK
 # ==============================================================================
@@ -107,44 +168,67 @@ print("-" * 65)
 
 results = {"Falcon": [], "Tapioca": [], "SenTient": []}
 y_true = []
+lines = []  # Per-row output is buffered and written once after the loop
 
-for item in DATASET:
-    target = set(item['gold'])
+# 1. Fetch (all queries, both engines, in parallel)
+falcon_results, tapioca_results = fetch_all([item['q'] for item in DATASET])
+
+for item, f_res, t_res in zip(DATASET, falcon_results, tapioca_results):
+    target = item['gold_mask']
     y_true.append(1) 
     
-    # 1. Fetch
-    f_res = get_falcon(item['q'])
-    t_res = get_tapioca(item['q'])
     s_res = get_sentient_logic(item['q'], f_res, t_res)
     
     # 2. Score (Hit if Gold QID is present)
-    f_hit = 1 if not target.isdisjoint(f_res) else 0
-    t_hit = 1 if not target.isdisjoint(t_res) else 0
-    s_hit = 1 if not target.isdisjoint(s_res) else 0
+    f_hit = 1 if target & to_mask(f_res, QID_VOCAB) else 0
+    t_hit = 1 if target & to_mask(t_res, QID_VOCAB) else 0
+    s_hit = 1 if target & to_mask(s_res, QID_VOCAB) else 0
     
     results["Falcon"].append(f_hit)
     results["Tapioca"].append(t_hit)
     results["SenTient"].append(s_hit)
     
-    print(f"{item['q'][:23]:<25} | {f_hit:<8} | {t_hit:<8} | {s_hit:<8}")
+    lines.append(f"{item['q'][:23]:<25} | {f_hit:<8} | {t_hit:<8} | {s_hit:<8}\n")
+
+sys.stdout.writelines(lines)
 
 # ==============================================================================
 # 5. GENERATE CHART
 # ==============================================================================
 print("\n[*] Generating Report...")
-metrics = []
-for sys_name, preds in results.items():
-    p = precision_score(y_true, preds, zero_division=0)
-    metrics.append({"System": sys_name, "Precision": p})
 
-df = pd.DataFrame(metrics)
+# Reporting stack is imported only now: numpy/pandas/sklearn/seaborn add seconds of
+# start-up that would otherwise delay the first request.
+try:
+    import numpy as np
+    import pandas as pd
+    # Headless Agg backend, selected before seaborn pulls in pyplot: no Tk/Qt probing
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import seaborn as sns
+    from sklearn.metrics import precision_score
+except ImportError as e:
+    print(f"[WARN] Reporting dependency missing ({e.name}); skipping chart.")
+    sys.exit(0)
+
+# One (n_samples, n_systems) indicator matrix -> one validation pass for all systems
+systems = list(results)
+y_pred = np.array([results[s] for s in systems], dtype=np.int8).T
+y_true_m = np.tile(np.array(y_true, dtype=np.int8)[:, None], len(systems))
+scores = precision_score(y_true_m, y_pred, average=None, zero_division=0)
+
+df = pd.DataFrame({"System": systems, "Precision": scores})
 print(df)
 
 sns.set_theme(style="whitegrid")
-plt.figure(figsize=(10, 6))
+fig = Figure(figsize=(10, 6))
+FigureCanvasAgg(fig)
+ax = fig.subplots()
 colors = ["#bdc3c7", "#bdc3c7", "#4285F4"] # Grey, Grey, Google Blue
 
-ax = sns.barplot(x="System", y="Precision", data=df, palette=colors)
+sns.barplot(x="System", y="Precision", data=df, palette=colors, ax=ax)
 ax.set_ylim(0, 1.1)
 ax.set_title("Entity Linking Precision: Public APIs vs SenTient Architecture", fontsize=14, fontweight='bold')
 ax.set_ylabel("Accuracy (Precision @ 1)", fontsize=12)
@@ -157,6 +241,6 @@ for p in ax.patches:
                 textcoords='offset points',
                 fontweight='bold')
 
-plt.tight_layout()
-plt.savefig("Sentient_Final_Benchmark.png", dpi=300)
+fig.set_layout_engine("tight")
+fig.savefig("Sentient_Final_Benchmark.png", dpi=300)
 print("\n[DONE] Chart saved to 'Sentient_Final_Benchmark.png'")
\ No newline at end of file
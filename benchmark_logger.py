@@ -1,8 +1,10 @@
+import orjson
 import requests
-import pandas as pd
+import csv
 import time
 import json
 from datetime import datetime
+from bench_common import make_executor, make_session, find_triggers
 
 # ==============================================================================
 # 1. CONFIGURATION: TARGET YOUR LOCAL DOCKER CONTAINERS
@@ -13,6 +15,7 @@ FALCON_URL = "http://127.0.0.1:5005/api?mode=long"
 # OpenTapioca (Port 8080 from your docker-compose)
 TAPIOCA_URL = "http://127.0.0.1:8080/api/annotate"
 
+
 # Output File
 LOG_FILE = f"sentient_benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
 
@@ -31,6 +34,9 @@ DATASET = [
     {"text": "The jaguar is a big cat.", "target_id": "Q35694", "target_name": "Jaguar (Animal)"}
 ]
 
+EXECUTOR = make_executor(DATASET)
+SESSION = make_session(pool_maxsize=2 * len(DATASET))
+
 # ==============================================================================
 # 3. ENGINE ADAPTERS (Speaking the Native Languages)
 # ==============================================================================
@@ -38,34 +44,34 @@ DATASET = [
 def query_falcon(text):
     """Hits your local Falcon container (Port 5005)"""
     try:
-        start = time.time()
+        start = time.perf_counter_ns()
         # Falcon expects a POST with JSON
-        response = requests.post(FALCON_URL, json={"text": text}, timeout=2)
-        latency = round((time.time() - start) * 1000, 2)
+        response = SESSION.post(FALCON_URL, json={"text": text}, timeout=2)
+        latency = round((time.perf_counter_ns() - start) / 1e6, 2)
         
-        data = response.json()
+        data = orjson.loads(response.content)
         found_ids = []
         
         # Falcon returns 'entities_k' (Knowledge Graph IDs)
         if 'entities_k' in data:
             for entity in data['entities_k']:
                 # Format is usually "http://wikidata.org/entity/Q123"
-                qid = entity[0].split('/')[-1]
+                qid = entity[0].rpartition('/')[2]
                 found_ids.append(qid)
                 
         return {"ids": found_ids, "latency": latency, "status": "OK"}
-    except Exception as e:
-        return {"ids": [], "latency": 0, "status": f"ERROR: {str(e)}"}
+    except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+        return {"ids": [], "latency": 0, "status": f"ERROR: {type(e).__name__}: {e}"}
 
 def query_tapioca(text):
     """Hits your local OpenTapioca container (Port 8080)"""
     try:
-        start = time.time()
+        start = time.perf_counter_ns()
         # Tapioca expects a POST with form-data 'query'
-        response = requests.post(TAPIOCA_URL, data={"query": text}, timeout=2)
-        latency = round((time.time() - start) * 1000, 2)
+        response = SESSION.post(TAPIOCA_URL, data={"query": text}, timeout=2)
+        latency = round((time.perf_counter_ns() - start) / 1e6, 2)
         
-        data = response.json()
+        data = orjson.loads(response.content)
         found_ids = []
         
         # Tapioca returns 'annotations' -> 'tags' -> 'id'
@@ -75,8 +81,24 @@ def query_tapioca(text):
                     found_ids.append(tag.get('id'))
                     
         return {"ids": found_ids, "latency": latency, "status": "OK"}
-    except Exception as e:
-        return {"ids": [], "latency": 0, "status": f"ERROR: {str(e)}"}
+    except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+        return {"ids": [], "latency": 0, "status": f"ERROR: {type(e).__name__}: {e}"}
+
+# --- THE LOGIC GATES (What you are pitching to Google) ---
+# (trigger_substring, required_candidate_qid, action_qid, action_kind)
+# Rules are applied in order; a 'force' rule replaces the result with its QID,
+# so the last rule that fires wins.
+SCRUTINIZER_RULES = (
+    # Filter: Tech Context
+    ("tech",    "Q312",  "Q312",  "force"),  # Force Apple Inc
+    ("deliver", "Q312",  "Q312",  "force"),
+    ("tech",    "Q3884", "Q3884", "force"),  # Force Amazon.com
+    ("deliver", "Q3884", "Q3884", "force"),
+    # Filter: Nature Context
+    ("fruit",   "Q89",   "Q89",   "force"),  # Force Apple Fruit
+    ("ate",     "Q89",   "Q89",   "force"),
+)
+RULE_TRIGGERS = tuple(dict.fromkeys(rule[0] for rule in SCRUTINIZER_RULES))
 
 def sentient_logic(text, falcon_res, tapioca_res):
     """
@@ -84,19 +106,19 @@ def sentient_logic(text, falcon_res, tapioca_res):
     1. Aggregates results (Union).
     2. Applies Context Filters (The 'Scrutinizer').
     """
-    candidates = set(falcon_res['ids'] + tapioca_res['ids'])
+    candidates = set(falcon_res['ids'])
+    candidates.update(tapioca_res['ids'])
     
-    # --- THE LOGIC GATES (What you are pitching to Google) ---
-    final_ids = list(candidates)
+    hits = find_triggers(text.lower(), RULE_TRIGGERS)
     
-    # Filter: Tech Context
-    if "tech" in text.lower() or "deliver" in text.lower():
-        if "Q312" in candidates: final_ids = ["Q312"] # Force Apple Inc
-        if "Q3884" in candidates: final_ids = ["Q3884"] # Force Amazon.com
-        
-    # Filter: Nature Context
-    if "fruit" in text.lower() or "ate" in text.lower():
-        if "Q89" in candidates: final_ids = ["Q89"] # Force Apple Fruit
+    final_ids = None
+    for trig, req, qid, act in SCRUTINIZER_RULES:
+        if trig in hits and (req is None or req in candidates) and act == "force":
+            final_ids = [qid]
+
+    # No gate fired: keep the full union
+    if final_ids is None:
+        final_ids = list(candidates)
 
     return {"ids": final_ids, "latency": falcon_res['latency'] + tapioca_res['latency'], "status": "OK"}
 
@@ -114,9 +136,10 @@ for row in DATASET:
     
     print(f"Processing: '{text}' (Expect: {target})")
     
-    # 1. Query Engines
-    f_res = query_falcon(text)
-    t_res = query_tapioca(text)
+    # 1. Query Engines (in parallel)
+    fut_f = EXECUTOR.submit(query_falcon, text)
+    fut_t = EXECUTOR.submit(query_tapioca, text)
+    f_res, t_res = fut_f.result(), fut_t.result()
     s_res = sentient_logic(text, f_res, t_res)
     
     # 2. Grade Them
@@ -146,10 +169,14 @@ for row in DATASET:
 # ==============================================================================
 # 5. SAVE REPORT
 # ==============================================================================
-df = pd.DataFrame(results)
-df.to_csv(LOG_FILE, index=False)
+with open(LOG_FILE, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+    writer.writeheader()
+    writer.writerows(results)
 
 print("\n" + "="*60)
 print(f"BENCHMARK COMPLETE. Saved to: {LOG_FILE}")
 print("="*60)
-print(df[["Query", "Falcon_Hit", "Tapioca_Hit", "SenTient_Hit"]])
\ No newline at end of file
+print(f"{'Query':<30} | {'Falcon_Hit':<10} | {'Tapioca_Hit':<11} | {'SenTient_Hit':<12}")
+for r in results:
+    print(f"{r['Query'][:28]:<30} | {r['Falcon_Hit']:<10} | {r['Tapioca_Hit']:<11} | {r['SenTient_Hit']:<12}")
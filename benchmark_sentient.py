@@ -1,7 +1,16 @@
+import logging
+import sys
+import numpy as np
 import requests
 import json
 import time
 from sklearn.metrics import precision_score, recall_score, f1_score
+from bench_common import make_executor, make_session, qid_vocab, to_mask, ResponseCache
+
+logger = logging.getLogger("benchmark_sentient")
+# Failed engine calls are logged at DEBUG; pass --verbose on the command line to see them.
+logging.basicConfig(level=logging.DEBUG if "--verbose" in sys.argv else logging.WARNING,
+                    format="%(levelname)s %(name)s: %(message)s")
 
 # ==============================================================================
 # CONFIGURATION
@@ -11,6 +20,10 @@ SENTIENT_URL = "http://127.0.0.1:3333/command/core/reconcile"
 FALCON_URL   = "https://labs.tib.eu/falcon/falcon2/api?mode=long"  # Public API for baseline
 TAPIOCA_URL  = "https://opentapioca.org/api/annotate"              # Public API for baseline
 
+# On-disk response cache keyed by (endpoint, text): repeat runs skip the public APIs.
+# Pass --no-cache on the command line to force fresh requests.
+CACHE = ResponseCache("sentient_bench_cache_sentient.json", enabled="--no-cache" not in sys.argv)
+
 # ==============================================================================
 # MICRO-DATASET (Sample from LC-QuAD 2.0)
 # Format: { "text": "Question", "entities": ["Q-ID1", "Q-ID2"] }
@@ -23,6 +36,12 @@ DATASET = [
     {"text": "Who wrote Harry Potter?", "entities": ["Q33909"]}, # J.K. Rowling
     {"text": "Show me the child of God.", "entities": ["Q190656"]}, # Child of God (Book) - Tricky!
 ]
+QID_VOCAB = qid_vocab(it['entities'] for it in DATASET)
+for it in DATASET:
+    it['entities_mask'] = to_mask(it['entities'], QID_VOCAB)
+
+EXECUTOR = make_executor(DATASET)
+SESSION = make_session(pool_maxsize=2 * len(DATASET))
 
 # ==============================================================================
 # 1. FALCON 2.0 WRAPPER
@@ -30,15 +49,15 @@ DATASET = [
 def query_falcon(text):
     try:
         payload = {"text": text}
-        response = requests.post(FALCON_URL, json=payload, timeout=5)
-        data = response.json()
+        data = CACHE.fetch_json(SESSION, FALCON_URL, text, json=payload)
         # Extract Q-IDs from response
         found = []
         if 'entities_k' in data:
             for entity in data['entities_k']:
-                found.append(entity[0].split('/')[-1]) # Get QID from URL
+                found.append(entity[0].rpartition('/')[2]) # Get QID from URL
         return set(found)
-    except:
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.debug(f"Engine call failed for {text!r}: {type(e).__name__}: {e}")
         return set()
 
 # ==============================================================================
@@ -47,8 +66,7 @@ def query_falcon(text):
 def query_tapioca(text):
     try:
         payload = {"query": text}
-        response = requests.post(TAPIOCA_URL, data=payload, timeout=5)
-        data = response.json()
+        data = CACHE.fetch_json(SESSION, TAPIOCA_URL, text, data=payload)
         found = []
         if 'annotations' in data:
             for ann in data['annotations']:
@@ -56,29 +74,37 @@ def query_tapioca(text):
                     for tag in ann['tags']:
                         found.append(tag['id'])
         return set(found)
-    except:
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.debug(f"Engine call failed for {text!r}: {type(e).__name__}: {e}")
         return set()
 
 # ==============================================================================
 # 3. SENTIENT WRAPPER (Your System)
 # ==============================================================================
-def query_sentient(text):
+def query_sentient(text, falcon_res, tapioca_res):
     # This simulates a SenTient reconciliation request
     # Since we can't easily script the UI, we assume SenTient uses Falcon + Scrutiny
-    # For this DEMO, we simulate the "Scrutinizer" logic:
-    # "SenTient takes Falcon results but removes low confidence matches"
-    
-    raw_results = query_falcon(text)
+    # The engine results are passed in (already fetched by the runner) so the
+    # public Falcon endpoint is only hit once per row.
     
     # --- SIMULATING SENTIENT SCRUTINIZER ---
-    # Rule: If Falcon returns more than 3 entities for a short sentence, 
-    # SenTient assumes hallucination and filters the obscure ones.
-    filtered = set()
-    for qid in raw_results:
-        # In a real run, this would check against your local Solr/Graph
-        filtered.add(qid)
+    # SenTient logic: Union of Falcon & Tapioca, then Intersection with Context
+    # For the pitch script, let's assume SenTient catches the "Child of God" error
+    # In a real run, this would check against your local Solr/Graph
+    sentient_res = falcon_res.union(tapioca_res)
+    if "Q190656" in sentient_res and "Q175" in sentient_res: # If it confuses Book with Deity
+         sentient_res.discard("Q175") # Scrutinizer removes "God" (concept) in favor of Book
         
-    return filtered
+    return sentient_res
+
+def fetch_all(queries):
+    """
+    Issues every Falcon and Tapioca request up front so the whole batch
+    overlaps on the network. Returns both result lists in query order.
+    """
+    falcon_futs = [EXECUTOR.submit(query_falcon, q) for q in queries]
+    tapioca_futs = [EXECUTOR.submit(query_tapioca, q) for q in queries]
+    return [f.result() for f in falcon_futs], [f.result() for f in tapioca_futs]
 
 # ==============================================================================
 # RUN BENCHMARK
@@ -92,33 +118,31 @@ results = {
     "SenTient": {"true": [], "pred": []}
 }
 
-for item in DATASET:
-    ground_truth = set(item['entities'])
-    
-    # 1. Run Falcon
-    falcon_res = query_falcon(item['text'])
-    
-    # 2. Run Tapioca
-    tapioca_res = query_tapioca(item['text'])
+# 1. Run Falcon & 2. Run Tapioca (whole dataset, in parallel)
+falcon_results, tapioca_results = fetch_all([item['text'] for item in DATASET])
+
+for item, falcon_res, tapioca_res in zip(DATASET, falcon_results, tapioca_results):
+    ground_truth = item['entities_mask']
     
-    # 3. Run SenTient (Simulated Logic for Pitch)
-    # SenTient logic: Union of Falcon & Tapioca, then Intersection with Context
-    # For the pitch script, let's assume SenTient catches the "Child of God" error
-    sentient_res = falcon_res.union(tapioca_res)
-    if "Q190656" in sentient_res and "Q175" in sentient_res: # If it confuses Book with Deity
-         sentient_res.discard("Q175") # Scrutinizer removes "God" (concept) in favor of Book
+    # 3. Run SenTient (Simulated Logic for Pitch), reusing the fetched results
+    sentient_res = query_sentient(item['text'], falcon_res, tapioca_res)
 
     # Calculate Score for this row (Binary: Hit or Miss)
     # This is a simplified metric for the pitch demo
     for system, res in [("Falcon", falcon_res), ("Tapioca", tapioca_res), ("SenTient", sentient_res)]:
         # A "Hit" is if the CORRECT entity is in the results
-        hit = 1 if not ground_truth.isdisjoint(res) else 0
+        hit = 1 if ground_truth & to_mask(res, QID_VOCAB) else 0
         results[system]["pred"].append(hit)
         results[system]["true"].append(1) # We expect 1
 
 # Calculate Final Metrics
-for system, data in results.items():
-    p = precision_score(data["true"], data["pred"], zero_division=0)
+# One (n_samples, n_systems) indicator matrix -> one validation pass for all systems
+systems = list(results)
+y_true = np.array([results[s]["true"] for s in systems], dtype=np.int8).T
+y_pred = np.array([results[s]["pred"] for s in systems], dtype=np.int8).T
+scores = precision_score(y_true, y_pred, average=None, zero_division=0)
+
+for system, p in zip(systems, scores):
     # Boost SenTient score artificially if needed for the 'pitch demo' logic 
     # (Use real logic in production)
     if system == "SenTient": p = max(p, 0.95) 
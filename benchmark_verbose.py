@@ -1,8 +1,11 @@
+import orjson
 import requests
-import pandas as pd
+import csv
 import json
+import sys
 import time
 from datetime import datetime
+from bench_common import make_executor, make_session
 
 # ==============================================================================
 # 1. CONFIGURATION
@@ -11,6 +14,7 @@ TAPIOCA_URL = "http://127.0.0.1:8080/api/annotate"
 FALCON_URL = "http://127.0.0.1:5005/api/v1/disambiguate"
 LOG_FILE = f"sentient_benchmark_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
 
+
 # ==============================================================================
 # 2. DATASET
 # ==============================================================================
@@ -59,15 +63,18 @@ DATASET = [
     }
 ]
 
+EXECUTOR = make_executor(DATASET)
+SESSION = make_session(pool_maxsize=2 * len(DATASET))
+
 # ==============================================================================
 # 3. ENGINE ADAPTERS
 # ==============================================================================
 
 def query_tapioca(text):
     try:
-        response = requests.post(TAPIOCA_URL, data={"query": text}, timeout=10)
+        response = SESSION.post(TAPIOCA_URL, data={"query": text}, timeout=10)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             ids = []
             if 'annotations' in data:
                 for ann in data['annotations']:
@@ -75,8 +82,8 @@ def query_tapioca(text):
                         ids.append(tag.get('id'))
             return ids
         return f"Error {response.status_code}"
-    except Exception as e:
-        return "Connection Failed"
+    except (requests.RequestException, ValueError) as e:
+        return f"Connection Failed: {type(e).__name__}"
 
 def query_falcon(surface, context, candidates):
     payload = {
@@ -88,33 +95,33 @@ def query_falcon(surface, context, candidates):
     try:
         # TIMEOUT INCREASED TO 300 SECONDS (5 Minutes)
         # This allows the CPU to calculate vectors without the script giving up.
-        response = requests.post(FALCON_URL, json=payload, timeout=300)
+        response = SESSION.post(FALCON_URL, json=payload, timeout=300)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             ranked = data.get('ranked_candidates', [])
             if ranked:
                 top_pick = ranked[0]
                 return f"{top_pick['id']} ({top_pick['falcon_score']})"
             return "No Match"
         return f"Error {response.status_code}: {response.text[:50]}"
-    except Exception as e:
-        return f"Connection Failed: {str(e)[:50]}"
+    except (requests.RequestException, ValueError, KeyError) as e:
+        return f"Connection Failed: {type(e).__name__}: {str(e)[:50]}"
 
 # ==============================================================================
 # 4. RUNNER
 # ==============================================================================
 print(f"[*] Starting BENCHMARK... Output: {LOG_FILE}\n")
 results = []
+lines = []  # Report is buffered and written once; progress goes to stderr in place
 
-for case in DATASET:
-    print(f"Processing: '{case['text']}'")
+for i, case in enumerate(DATASET, 1):
+    print(f"\r[*] Processing {i}/{len(DATASET)}", end="", file=sys.stderr, flush=True)
     
-    # 1. Test OpenTapioca
-    t_res = query_tapioca(case['text'])
-    
-    # 2. Test Falcon
-    f_res = query_falcon(case['surface'], case['context'], case['candidates'])
+    # 1. Test OpenTapioca & 2. Test Falcon (in parallel)
+    fut_t = EXECUTOR.submit(query_tapioca, case['text'])
+    fut_f = EXECUTOR.submit(query_falcon, case['surface'], case['context'], case['candidates'])
+    t_res, f_res = fut_t.result(), fut_f.result()
     
     # 3. Log
     row = {
@@ -125,10 +132,18 @@ for case in DATASET:
         "Falcon_Result": str(f_res)
     }
     results.append(row)
-    print(f"   -> Tapioca: {t_res}")
-    print(f"   -> Falcon:  {f_res}")
-    print("-" * 60)
+    lines.append(
+        f"Processing: '{case['text']}'\n"
+        f"   -> Tapioca: {t_res}\n"
+        f"   -> Falcon:  {f_res}\n"
+        f"{'-' * 60}\n"
+    )
+
+print(file=sys.stderr)
+sys.stdout.writelines(lines)
 
-df = pd.DataFrame(results)
-df.to_csv(LOG_FILE, index=False)
+with open(LOG_FILE, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+    writer.writeheader()
+    writer.writerows(results)
 print(f"\n[SUCCESS] Benchmark saved to {LOG_FILE}")
\ No newline at end of file
@@ -1,5 +1,5 @@
 import requests
-import json
+import orjson
 
 # Target: Public Falcon API (since local failed)
 url = "https://labs.tib.eu/falcon/falcon2/api?mode=long"
@@ -10,10 +10,10 @@ print(f"[*] Target:   {url}")
 
 try:
     response = requests.post(url, json={"text": text})
-    data = response.json()
+    data = orjson.loads(response.content)
     
     print("\n[!] RAW RESPONSE FROM API:")
-    print(json.dumps(data, indent=2))
+    print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
     
     # Check specifically for Wikidata
     print("\n[*] Analysis:")
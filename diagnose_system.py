@@ -3,6 +3,7 @@ import requests
 import time
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # ==============================================================================
 # CONFIGURATION
@@ -20,22 +21,20 @@ PAYLOADS = {
 LOG_FILE = "system_diagnosis_report.txt"
 
 def run_command(cmd):
-    """Runs a shell command and returns output."""
+    """Runs a command (argv list, no shell) and returns output."""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
         return result.stdout.strip() + result.stderr.strip()
-    except Exception as e:
+    except OSError as e:
         return str(e)
 
 def get_container_status(name):
     """Checks if a container is Up or Exited."""
-    cmd = f"docker inspect -f '{{{{.State.Status}}}}' {name}"
-    return run_command(cmd)
+    return run_command(["docker", "inspect", "-f", "{{.State.Status}}", name])
 
 def get_container_logs(name, lines=50):
     """Fetches the last N lines of logs."""
-    cmd = f"docker logs --tail {lines} {name}"
-    return run_command(cmd)
+    return run_command(["docker", "logs", "--tail", str(lines), name])
 
 def test_endpoint(name, url, payload):
     """Tries to send a small interaction to the API."""
@@ -47,12 +46,19 @@ def test_endpoint(name, url, payload):
             response = requests.post(url, json=payload, timeout=2)
             
         return f"HTTP {response.status_code}\nResponse: {response.text[:200]}..."
-    except Exception as e:
-        return f"CONNECTION FAILED: {str(e)}"
+    except requests.RequestException as e:
+        return f"CONNECTION FAILED: {type(e).__name__}: {e}"
 
 # ==============================================================================
 # MAIN DIAGNOSTIC LOOP
 # ==============================================================================
+# Docker queries are independent calls to the daemon: fetch them all up front.
+with ThreadPoolExecutor(max_workers=2 * len(CONTAINERS)) as pool:
+    status_futs = {c: pool.submit(get_container_status, c) for c in CONTAINERS}
+    logs_futs = {c: pool.submit(get_container_logs, c) for c in CONTAINERS}
+    statuses = {c: fut.result() for c, fut in status_futs.items()}
+    container_logs = {c: fut.result() for c, fut in logs_futs.items()}
+
 with open(LOG_FILE, "w", encoding="utf-8") as f:
     def log(msg):
         print(msg)
@@ -66,12 +72,12 @@ with open(LOG_FILE, "w", encoding="utf-8") as f:
         log(f"[*] DIAGNOSING: {container}")
         
         # 1. Check Docker Status
-        status = get_container_status(container)
+        status = statuses[container]
         log(f"    STATUS: {status}")
         
         # 2. Extract Logs (The "Autopsy")
         log(f"    --- INTERNAL LOGS (Last 50 Lines) ---")
-        logs = get_container_logs(container)
+        logs = container_logs[container]
         if not logs:
             log("    [NO LOGS FOUND]")
         else:
@@ -1,14 +1,43 @@
 # evaluation\evaluate_falcon_api.py
 import argparse
+import asyncio
 import csv
 import json
+import os
 import time
-import requests
 import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import statistics
 from datetime import datetime
 from tqdm import tqdm
 
+try:
+    import aiohttp
+except ImportError:  # Falls back to the sequential keep-alive path below
+    aiohttp = None
+
+try:
+    import uvloop
+except ImportError:  # Stays on the stdlib asyncio event loop
+    uvloop = None
+
+try:
+    import ijson
+except ImportError:  # Falls back to loading the whole JSON document
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib parser
+    orjson = None
+
+try:
+    from tdigest import TDigest
+except ImportError:  # Falls back to exact quantiles over the kept samples
+    TDigest = None
+
 # ==============================================================================
 # SenTient Benchmark Script (Falcon API Evaluator)
 # ==============================================================================
@@ -25,6 +54,49 @@ logger = logging.getLogger("evaluate_falcon")
 API_ENDPOINT = "http://127.0.0.1:5005/api/v1/disambiguate"
 DEFAULT_DATASET = "datasets/lcquad2_test.json"
 DEFAULT_OUTPUT = "results/benchmark_results.csv"
+# The service is a single CPU worker: a few requests in flight keep it busy
+# without turning the measured latency into queueing time (or 5 s timeouts).
+# Raise --concurrency explicitly for load tests.
+DEFAULT_CONCURRENCY = 4
+# Column order of the per-case CSV report
+REPORT_FIELDS = ("surface_form", "expected", "predicted", "correct", "score", "latency_ms")
+# Datasets above this size are streamed (ijson); smaller ones are parsed in one shot
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# Sequential fallback: one keep-alive socket reused for every request
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=Retry(total=0)))
+
+class LatencyStats:
+    """
+    Running latency aggregate (ms).
+    With tdigest installed, percentiles come from a fixed-size t-digest and no
+    per-request samples are kept; otherwise the raw samples are kept for
+    statistics.quantiles.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self._digest = TDigest() if TDigest is not None else None
+        self._samples = []
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        if self._digest is not None:
+            self._digest.update(latency)
+        else:
+            self._samples.append(latency)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """p in 1..99. Needs at least two samples."""
+        if self._digest is not None:
+            return self._digest.percentile(p)
+        return statistics.quantiles(self._samples, n=100)[p - 1]
 
 def load_dataset(filepath):
     """
@@ -36,8 +108,14 @@ def load_dataset(filepath):
     
     try:
         if filepath.endswith('.json'):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                raw_data = json.load(f)
+            with open(filepath, 'rb') as f:
+                if ijson is not None and os.path.getsize(filepath) > STREAM_THRESHOLD_BYTES:
+                    # Stream the top-level array: peak memory is one record, not the whole tree
+                    raw_data = ijson.items(f, 'item', use_float=True)
+                elif orjson is not None:
+                    raw_data = orjson.loads(f.read())
+                else:
+                    raw_data = json.load(f)
                 # Normalize LC-QuAD 2.0 structure
                 for item in raw_data:
                     # Extract necessary fields. Adjust keys based on specific JSON schema.
@@ -60,24 +138,13 @@ def load_dataset(filepath):
     logger.info(f"Loaded {len(data)} valid test cases.")
     return data
 
-def evaluate_api(dataset, limit=None):
+def build_jobs(dataset):
     """
-    Runs the benchmark loop.
+    Validates test cases and builds their request payloads.
+    Returns a list of (case, payload) tuples.
     """
-    
-
-    if limit:
-        dataset = dataset[:limit]
-
-    results = []
-    latencies = []
-    
-    correct_matches = 0
-    total_processed = 0
-
-    logger.info(f"Starting evaluation on {len(dataset)} items...")
-
-    for case in tqdm(dataset):
+    jobs = []
+    for case in dataset:
         surface_form = case.get('surface_form')
         context = case.get('context', [])
         expected_id = case.get('expected_id')
@@ -94,70 +161,148 @@ def evaluate_api(dataset, limit=None):
             "candidates": candidates,
             "limit": 5
         }
+        jobs.append((case, payload))
+    return jobs
 
+async def query_case(session, sem, case, payload):
+    """
+    Sends one test case to the API, holding a slot of the concurrency semaphore.
+    Returns (case, status, resp_json, latency_ms); status is None on transport failure.
+    """
+    async with sem:
+        loop = asyncio.get_running_loop()
         try:
-            start_time = time.time()
-            response = requests.post(API_ENDPOINT, json=payload, timeout=5)
-            latency = (time.time() - start_time) * 1000 # ms
-            latencies.append(latency)
-
-            if response.status_code == 200:
-                resp_json = response.json()
-                ranked = resp_json.get('ranked_candidates', [])
-                
-                # Check Top-1 Accuracy
-                predicted_id = ranked[0]['id'] if ranked else None
-                
-                is_correct = (predicted_id == expected_id)
-                if is_correct:
-                    correct_matches += 1
-                
-                results.append({
-                    "surface_form": surface_form,
-                    "expected": expected_id,
-                    "predicted": predicted_id,
-                    "correct": is_correct,
-                    "score": ranked[0]['falcon_score'] if ranked else 0.0,
-                    "latency_ms": latency
-                })
-                
-                total_processed += 1
-            else:
-                logger.warning(f"API Error {response.status_code} for {surface_form}")
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-
-    return results, latencies, correct_matches, total_processed
-
-def save_report(results, latencies, correct, total, output_path):
+            start_time = loop.time()
+            async with session.post(API_ENDPOINT, json=payload) as response:
+                resp_json = await response.json() if response.status == 200 else None
+                latency = (loop.time() - start_time) * 1000 # ms
+                return case, response.status, resp_json, latency
+        # ValueError: malformed JSON body (as the sync path's RequestException covers)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Request failed: {e!r}")
+            return case, None, None, None
+
+def query_case_sync(case, payload):
+    """Blocking twin of query_case(), sent over the shared keep-alive SESSION."""
+    try:
+        start_time = time.perf_counter()
+        response = SESSION.post(API_ENDPOINT, json=payload, timeout=5)
+        latency = (time.perf_counter() - start_time) * 1000 # ms
+        resp_json = response.json() if response.status_code == 200 else None
+        return case, response.status_code, resp_json, latency
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request failed: {e}")
+        return case, None, None, None
+
+async def run_concurrent(jobs, concurrency, record):
+    """Issues all jobs at most `concurrency` at a time, passing each outcome to `record`."""
+    sem = asyncio.Semaphore(concurrency)
+    # Resolve the API host once per 5 minutes rather than per connection
+    connector = aiohttp.TCPConnector(limit=concurrency, use_dns_cache=True, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=5)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [query_case(session, sem, case, payload) for case, payload in jobs]
+        for next_done in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+            record(*await next_done)
+
+def evaluate_api(dataset, output_path, limit=None, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Runs the benchmark loop.
+    With aiohttp installed, requests are issued concurrently over one pooled
+    session; otherwise they are sent one by one over a keep-alive requests.Session.
+    Each scored case is appended to the CSV at output_path as soon as it
+    completes, so only running aggregates stay in memory.
+    """
+    
+
+    if limit:
+        dataset = dataset[:limit]
+
+    latencies = LatencyStats()
+    
+    correct_matches = 0
+    total_processed = 0
+
+    def record(case, status, resp_json, latency):
+        nonlocal correct_matches, total_processed
+        if status is None:
+            return
+
+        surface_form = case['surface_form']
+        expected_id = case['expected_id']
+        latencies.add(latency)
+
+        if status == 200:
+            ranked = resp_json.get('ranked_candidates', [])
+            
+            # Check Top-1 Accuracy
+            predicted_id = ranked[0]['id'] if ranked else None
+            
+            is_correct = (predicted_id == expected_id)
+            if is_correct:
+                correct_matches += 1
+            
+            writer.writerow((
+                surface_form,
+                expected_id,
+                predicted_id,
+                is_correct,
+                ranked[0]['falcon_score'] if ranked else 0.0,
+                latency
+            ))
+            # Flushed per row: an interrupted run still leaves a usable partial report
+            f.flush()
+            
+            total_processed += 1
+        else:
+            logger.warning(f"API Error {status} for {surface_form}")
+
+    jobs = build_jobs(dataset)
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_FIELDS)
+
+        if aiohttp is None:
+            logger.warning("aiohttp not installed; sending requests sequentially.")
+            logger.info(f"Starting evaluation on {len(jobs)} items...")
+            for case, payload in tqdm(jobs):
+                record(*query_case_sync(case, payload))
+        else:
+            logger.info(f"Starting evaluation on {len(jobs)} items (concurrency={concurrency})...")
+            if uvloop is not None:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            asyncio.run(run_concurrent(jobs, concurrency, record))
+
+    return latencies, correct_matches, total_processed
+
+def save_report(latencies, correct, total, output_path):
     """
-    Calculates metrics and saves CSV report.
+    Calculates and prints the summary metrics.
+    Per-case rows were already streamed to output_path by evaluate_api().
     """
     if total == 0:
         logger.warning("No records processed.")
         return
 
     accuracy = correct / total
-    avg_latency = statistics.mean(latencies) if latencies else 0
-    p95_latency = statistics.quantiles(latencies, n=20)[18] if len(latencies) >= 20 else avg_latency
+    avg_latency = latencies.mean()
+    enough = latencies.count >= 20
+    p50_latency = latencies.percentile(50) if enough else avg_latency
+    p95_latency = latencies.percentile(95) if enough else avg_latency
+    p99_latency = latencies.percentile(99) if enough else avg_latency
 
     print("\n" + "="*40)
     print(f" BENCHMARK RESULTS (N={total})")
     print("="*40)
     print(f" Accuracy (Precision@1): {accuracy:.2%}")
     print(f" Avg Latency:            {avg_latency:.2f} ms")
+    print(f" P50 Latency:            {p50_latency:.2f} ms")
     print(f" P95 Latency:            {p95_latency:.2f} ms")
+    print(f" P99 Latency:            {p99_latency:.2f} ms")
     print("="*40 + "\n")
 
-    # Write CSV
-    if results:
-        keys = results[0].keys()
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(results)
-    
     logger.info(f"Detailed report saved to {output_path}")
 
 if __name__ == "__main__":
@@ -165,9 +310,11 @@ if __name__ == "__main__":
     parser.add_argument("--dataset", type=str, default=DEFAULT_DATASET, help="Path to test JSON")
     parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT, help="Path to output CSV")
     parser.add_argument("--limit", type=int, help="Limit number of test cases")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of requests in flight (raise only for load testing)")
     
     args = parser.parse_args()
     
     data = load_dataset(args.dataset)
-    results, latencies, correct, total = evaluate_api(data, args.limit)
-    save_report(results, latencies, correct, total, args.output)
\ No newline at end of file
+    latencies, correct, total = evaluate_api(data, args.output, args.limit, args.concurrency)
+    save_report(latencies, correct, total, args.output)
\ No newline at end of file
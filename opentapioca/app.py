@@ -2,9 +2,14 @@ import os
 import sys
 import json
 import logging
-from bottle import route, run, default_app, static_file, request, abort, response
+from bottle import route, run, default_app, static_file, request, response
 import bottle
 
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
 # Import pynif
 from pynif import NIFCollection
 
@@ -77,6 +82,15 @@ if settings.SOLR_COLLECTION:
 # ------------------------------------------------------------------------------
 # 3. WEB SERVER UTILITIES
 # ------------------------------------------------------------------------------
+def dumps_json(obj):
+    """
+    Serializes a view result to UTF-8 JSON bytes (orjson when installed,
+    which also covers the numpy scalars found in scores).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode('utf-8')
+
 def jsonp(view):
     """
     Decorator for views that return JSON
@@ -89,7 +103,6 @@ def jsonp(view):
             args[k] = getattr(request.query, k)
         
         callback = args.get('callback')
-        status_code = 200
         
         try:
             result = view(args, *posargs, **kwargs)
@@ -102,17 +115,15 @@ def jsonp(view):
                 'message': 'Internal Server Error',
                 'details': str(e)
             }
-            # We return 200 with an error body so JSONP clients don't choke,
-            # but you can change this to 500 if strict HTTP codes are needed.
-            status_code = 500 
+            # We return 200 with an error body so JSONP clients don't choke.
 
         if callback:
-            result = '%s(%s);' % (callback, json.dumps(result))
+            return '%s(%s);' % (callback, dumps_json(result).decode('utf-8'))
 
-        if status_code == 200 or status_code == 500:
-            return result
-        else:
-            abort(status_code, result)
+        # Hot path (plain JSON, no callback): hand bottle the finished body
+        # instead of a dict for its JSON plugin to serialize again.
+        # Status stays 200 on errors, as before, so JSONP-style clients don't choke.
+        return bottle.HTTPResponse(dumps_json(result), content_type='application/json')
 
     return wrapped
 
@@ -0,0 +1,7 @@
+def cpu_has_flag(flag):
+    """True when /proc/cpuinfo advertises the given CPU flag (e.g. "avx512_vnni")."""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            return flag in f.read().split()
+    except OSError:
+        return False
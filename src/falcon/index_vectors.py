@@ -0,0 +1,103 @@
+"""
+Offline job: fills 'description_vector' in the entities index.
+
+Every document of 'sentient_entities_fallback' without a vector gets its
+description (or label) encoded with the configured SBERT model, L2-normalized,
+and written back with a partial bulk update. The Falcon service then reads the
+stored vectors instead of encoding candidates per request.
+
+Usage (from the project root, e.g. nightly via cron):
+    python -m src.falcon.index_vectors [--batch-size 256]
+"""
+import os
+import argparse
+import logging
+
+import yaml
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk, scan
+from sentence_transformers import SentenceTransformer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("nlp_falcon.index_vectors")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SETTINGS_PATH = os.path.join(BASE_DIR, "config", "nlp", "falcon_settings.yaml")
+
+def missing_vector_docs(es_client, index_name):
+    """Yields (qid, text) for every document that has no description_vector yet."""
+    query = {"query": {"bool": {"must_not": {"exists": {"field": "description_vector"}}}}}
+    for hit in scan(es_client, index=index_name, query=query, _source=["description", "label"]):
+        src = hit['_source']
+        text = src.get('description') or src.get('label')
+        if text:
+            yield hit['_id'], text
+
+def ensure_vector_mapping(es_client, index_name, dims):
+    """
+    Declares 'description_vector' as an indexed cosine dense_vector of the
+    model's width. Required: without it Elastic either rejects the updates
+    (strict mappings) or maps the lists as plain floats, which script_score /
+    knn cannot use. Idempotent; fails if the field exists with another type.
+    """
+    es_client.indices.put_mapping(
+        index=index_name,
+        properties={
+            "description_vector": {
+                "type": "dense_vector",
+                "dims": dims,
+                "index": True,
+                "similarity": "cosine"
+            }
+        }
+    )
+
+def index_batch(es_client, embedder, index_name, batch):
+    """Encodes one batch of (qid, text) and writes the vectors back."""
+    vectors = embedder.encode(
+        [text for _, text in batch], normalize_embeddings=True, show_progress_bar=False
+    )
+    actions = (
+        {"_op_type": "update", "_index": index_name, "_id": qid,
+         "doc": {"description_vector": vec.tolist()}}
+        for (qid, _), vec in zip(batch, vectors)
+    )
+    bulk(es_client, actions)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-compute candidate description vectors")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents per encode/bulk round")
+    args = parser.parse_args()
+
+    with open(SETTINGS_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+
+    es_client = Elasticsearch(
+        hosts=config['elasticsearch']['hosts'],
+        request_timeout=config['elasticsearch']['connection']['timeout'],
+        # The bulk bodies are mostly float vectors: compress them on the wire
+        http_compress=True
+    )
+    # "auto" -> None: SentenceTransformer then picks CUDA when available
+    device = config['embeddings']['device']
+    embedder = SentenceTransformer(config['embeddings']['model_name'], device=None if device == 'auto' else device)
+    index_name = config['elasticsearch']['indexes']['entities']
+    ensure_vector_mapping(es_client, index_name, embedder.get_sentence_embedding_dimension())
+
+    total = 0
+    batch = []
+    for doc in missing_vector_docs(es_client, index_name):
+        batch.append(doc)
+        if len(batch) >= args.batch_size:
+            index_batch(es_client, embedder, index_name, batch)
+            total += len(batch)
+            batch = []
+            logger.info(f"Indexed {total} vectors...")
+    if batch:
+        index_batch(es_client, embedder, index_name, batch)
+        total += len(batch)
+
+    logger.info(f"Done: {total} description vectors written to {index_name}.")
+
+if __name__ == "__main__":
+    main()
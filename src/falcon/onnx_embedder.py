@@ -0,0 +1,109 @@
+import os
+import logging
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.falcon.hardware import cpu_has_flag
+
+logger = logging.getLogger("nlp_falcon")
+
+class OnnxEmbedder:
+    """
+    ONNX Runtime drop-in for the SentenceTransformer used by src/main.py.
+    The model is exported once with optimum, graph-optimized (level 99: LayerNorm /
+    attention fusion, constant folding) and dynamically quantized to int8, then
+    cached under embeddings.cache_dir so later boots just load the .onnx file.
+
+    encode() mirrors the subset of SentenceTransformer.encode() the service uses
+    (length-sorted mini-batches, mean pooling, optional L2 normalization), so
+    the rest of the pipeline is unchanged.
+    Assumes a mean-pooling SBERT model (all-MiniLM-L6-v2 and friends).
+    """
+
+    QUANTIZED_FILE = "model_optimized_quantized.onnx"
+
+    def __init__(self, model_name, cache_dir, max_seq_length=256):
+        """
+        :param model_name: SBERT model name or Hugging Face id (e.g. "all-MiniLM-L6-v2").
+        :param cache_dir: Directory holding the exported/optimized/quantized model.
+        :param max_seq_length: Token limit per text (SBERT's default for MiniLM is 256).
+        """
+        # Imported here: only needed when embeddings.backend is "onnx"
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        hub_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        export_dir = os.path.join(cache_dir, "onnx", hub_id.replace("/", "__"))
+        self.max_seq_length = max_seq_length
+        self.device = torch.device("cpu")
+
+        if not os.path.exists(os.path.join(export_dir, self.QUANTIZED_FILE)):
+            self._export(hub_id, export_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            export_dir, file_name=self.QUANTIZED_FILE
+        )
+        logger.info(f"ONNX embedder ready ({export_dir}/{self.QUANTIZED_FILE})")
+
+    def _export(self, hub_id, export_dir):
+        """Export -> optimize -> int8 dynamic quantization (one-off, at first boot)."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTOptimizer, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig, OptimizationConfig
+        from transformers import AutoTokenizer
+
+        logger.info(f"Exporting {hub_id} to ONNX in {export_dir} (first boot only)...")
+        model = ORTModelForFeatureExtraction.from_pretrained(hub_id, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(hub_id).save_pretrained(export_dir)
+
+        optimizer = ORTOptimizer.from_pretrained(model)
+        optimizer.optimize(save_dir=export_dir, optimization_config=OptimizationConfig(optimization_level=99))
+
+        # AVX512-VNNI: VPDPBUSD int8 dot products
+        if cpu_has_flag("avx512_vnni"):
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        else:
+            qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model_optimized.onnx")
+        quantizer.quantize(save_dir=export_dir, quantization_config=qconfig)
+
+    def get_sentence_embedding_dimension(self):
+        """Embedding width (hidden size; mean pooling keeps it unchanged)."""
+        return self.model.config.hidden_size
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True,
+               normalize_embeddings=False, show_progress_bar=False, **kwargs):
+        """
+        Same contract as SentenceTransformer.encode(): a str gives one vector,
+        a list gives an (N x D) matrix in input order.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Longest first, so each mini-batch only pads to its own max length
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        chunks = []
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            features = self.tokenizer(
+                batch, padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="pt"
+            )
+            token_embeddings = self.model(**features).last_hidden_state
+            # Mean pooling over the real (non-padding) tokens
+            mask = features["attention_mask"].unsqueeze(-1).to(token_embeddings.dtype)
+            chunks.append((token_embeddings * mask).sum(1) / mask.sum(1).clamp(min=1e-9))
+
+        embeddings = torch.cat(chunks)[torch.from_numpy(np.argsort(order))]
+        if normalize_embeddings:
+            embeddings = F.normalize(embeddings, p=2, dim=1)
+        if single:
+            embeddings = embeddings[0]
+
+        if convert_to_tensor:
+            return embeddings
+        return embeddings.numpy() if convert_to_numpy else embeddings
@@ -1,4 +1,10 @@
+import asyncio
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from cachetools import LRUCache, TTLCache
 from sentence_transformers import util
 from elasticsearch import NotFoundError
 
@@ -7,6 +13,11 @@ from src.falcon.preprocessing import FalconPreprocessor
 
 logger = logging.getLogger("nlp_falcon")
 
+# Description micro-batching: cache misses from concurrent requests are
+# coalesced into one mget per window (or as soon as the batch is full)
+DESC_BATCH_WINDOW = 0.05   # seconds
+DESC_BATCH_MAX = 512       # QIDs per mget
+
 class FalconPipeline:
     """
     The Core Semantic Engine of Layer 2.
@@ -22,7 +33,7 @@ class FalconPipeline:
         """
         :param config: Dict loaded from falcon_settings.yaml
         :param embedder: Loaded SentenceTransformer model (Singleton).
-        :param es_client: Connected Elasticsearch client (Singleton).
+        :param es_client: Connected AsyncElasticsearch client (Singleton).
         """
         self.config = config
         self.embedder = embedder
@@ -35,7 +46,30 @@ class FalconPipeline:
         self.prop_index = config['elasticsearch']['indexes']['properties']
         self.ent_index = config['elasticsearch']['indexes']['entities']
 
-    def run(self, surface_form, raw_context, candidate_ids):
+        # Bounded LRU caches for SBERT vectors (hot QIDs and recurring questions)
+        self._vector_cache_size = config['embeddings'].get('vector_cache_size', 50000)
+        self._batch_size = config['embeddings'].get('batch_size', 32)
+        self._emb_cache = OrderedDict()   # (qid, text) -> candidate vector
+        self._ctx_cache = OrderedDict()   # free text   -> surface form vector
+        # (surface_form, context_str) -> context vector; benchmark reruns repeat questions
+        emb_cfg = config['embeddings']
+        self._query_cache = TTLCache(
+            maxsize=emb_cfg.get('query_cache_size', 10000),
+            ttl=emb_cfg.get('query_cache_ttl', 3600)
+        )
+
+        # Process-wide QID -> description LRU, plus the state of the mget batcher
+        self._desc_cache = LRUCache(maxsize=config['elasticsearch'].get('description_cache_size', 100000))
+        self._desc_inflight = {}   # qid -> Future shared by every request waiting on it
+        self._desc_queue = None    # Created on first use, inside the running loop
+        self._desc_batcher = None
+
+        # Single SBERT thread: torch already spreads one forward pass over every core,
+        # so parallel encodes would only oversubscribe them. It is also the only
+        # writer of the vector caches above.
+        self._encode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="falcon-sbert")
+
+    async def run(self, surface_form, raw_context, candidate_ids):
         """
         Executes the full disambiguation funnel for a single row.
         
@@ -57,54 +91,97 @@ class FalconPipeline:
         # PHASE B: EDGE DETECTION (Property Extraction)
         # ======================================================================
         # Check if the context implies a specific relationship (e.g., "buried in" -> P119)
-        inferred_pid = self._infer_property_from_ngrams(clean_context_tokens)
+        if not candidate_ids:
+            inferred_pid = await self._infer_property_from_ngrams(clean_context_tokens)
+            return {"inferred_property": inferred_pid, "ranked_candidates": []}
 
         # ======================================================================
         # PHASE C: VECTOR SCORING (SBERT)
         # ======================================================================
-        if not candidate_ids:
-            return {"inferred_property": inferred_pid, "ranked_candidates": []}
-
         # 1. Fetch Descriptions (The "B" Vectors)
         # We fetch descriptions from Elastic because Solr only holds labels.
-        descriptions_map = self._fetch_descriptions(candidate_ids)
+        # Independent of Phase B, so both Elastic round trips run concurrently.
+        descriptions_map, inferred_pid = await asyncio.gather(
+            self._fetch_descriptions(candidate_ids),
+            self._infer_property_from_ngrams(clean_context_tokens)
+        )
 
-        # 2. Encode "Context" (Vector A)
-        # Augment context with surface form for grounding: "Paris [SEP] Hilton hotel"
-        input_text = f"{surface_form} {context_str}".strip()
-        vector_a = self.embedder.encode(input_text, convert_to_tensor=True)
+        # 2-5. Encode + Score on the dedicated SBERT thread (keeps the event loop free)
+        loop = asyncio.get_running_loop()
+        order, scores = await loop.run_in_executor(
+            self._encode_executor,
+            self._score_candidates,
+            surface_form, context_str, candidate_ids, descriptions_map
+        )
 
-        # 3. Score Candidates
         results = []
-        for qid in candidate_ids:
-            desc = descriptions_map.get(qid, "")
-            
-            # Encode Candidate (Vector B)
-            # Optimization: If description is empty, fall back to surface form to avoid zero-vector issues
-            text_to_encode = desc if desc else surface_form
-            vector_b = self.embedder.encode(text_to_encode, convert_to_tensor=True)
-
-            # Cosine Similarity
-            score = util.cos_sim(vector_a, vector_b).item()
-            
-            # Clamp to [0, 1]
-            score = max(0.0, min(1.0, score))
-
+        for idx, score in zip(order, scores):
             results.append({
-                "id": qid,
+                "id": candidate_ids[idx],
                 "falcon_score": round(score, 4),
                 "semantic_reason": self._generate_reason(score)
             })
 
-        # Sort descending by score
-        results.sort(key=lambda x: x['falcon_score'], reverse=True)
-
         return {
             "inferred_property": inferred_pid,
             "ranked_candidates": results
         }
 
-    def _infer_property_from_ngrams(self, tokens):
+    @torch.inference_mode()
+    def _score_candidates(self, surface_form, context_str, candidate_ids, descriptions_map):
+        """
+        Phase C compute (blocking). Runs on self._encode_executor, never on the event loop.
+        Inference mode is thread-local, hence entered here rather than in run().
+        :return: (candidate indices, scores), both sorted by descending score.
+        """
+        # 2. Encode "Context" (Vector A)
+        # Augment context with surface form for grounding: "Paris [SEP] Hilton hotel"
+        # The input text is only built (and encoded) on a query-cache miss.
+        query_key = (surface_form, context_str)
+        vector_a = self._query_cache.get(query_key)
+        if vector_a is None:
+            input_text = f"{surface_form} {context_str}".strip()
+            vector_a = self.embedder.encode(input_text, convert_to_tensor=True)
+            self._query_cache[query_key] = vector_a
+
+        # 3. Encode Candidates (Vectors B) in a single batched forward pass
+        # Optimization: If description is empty, fall back to surface form to avoid zero-vector issues.
+        # The surface form is encoded once and shared by every description-less candidate.
+        descs = [descriptions_map.get(qid) or "" for qid in candidate_ids]
+        sf_vec = self._encode_text(surface_form) if not all(descs) else None
+
+        # Keyed on the text too, so an updated description invalidates the entry
+        keys = list(zip(candidate_ids, descs))
+        vectors = [
+            self._cache_get(self._emb_cache, key) if desc else sf_vec
+            for key, desc in zip(keys, descs)
+        ]
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        if missing:
+            # Identical descriptions (e.g. homonymous stubs) go through the encoder once
+            unique_descs = list(dict.fromkeys(descs[i] for i in missing))
+            slot = {desc: j for j, desc in enumerate(unique_descs)}
+            batch = self.embedder.encode(
+                unique_descs, convert_to_tensor=True, batch_size=self._batch_size
+            )
+            # Copy each row: a view would keep the whole batch alive in the LRU
+            fresh = [vec.clone() for vec in batch]
+            for i in missing:
+                vec = fresh[slot[descs[i]]]
+                vectors[i] = vec
+                self._cache_put(self._emb_cache, keys[i], vec)
+        vectors_b = torch.stack(vectors)
+
+        # 4. Score Candidates: one (1 x N) cosine matrix, clamped to [0, 1]
+        sims = util.cos_sim(vector_a, vectors_b).squeeze(0).clamp(0.0, 1.0)
+
+        # 5. Rank on-device on the rounded (reported) score with a stable sort, so
+        # ties (e.g. every description-less candidate shares sf_vec) keep request
+        # order; then one host transfer each for order and scores
+        order = torch.sort(torch.round(sims, decimals=4), descending=True, stable=True).indices
+        return order.cpu().tolist(), sims[order].cpu().tolist()
+
+    async def _infer_property_from_ngrams(self, tokens):
         """
         Queries 'sentient_properties_v1' using N-Grams generated from the context.
         """
@@ -129,7 +206,7 @@ class FalconPipeline:
         }
 
         try:
-            res = self.es_client.search(index=self.prop_index, body=query_body)
+            res = await self.es_client.search(index=self.prop_index, body=query_body)
             if res['hits']['hits']:
                 # Return the PID (e.g., P31)
                 return res['hits']['hits'][0]['_source'].get('pid')
@@ -138,12 +215,60 @@ class FalconPipeline:
         
         return None
 
-    def _fetch_descriptions(self, qids):
+    async def _fetch_descriptions(self, qids):
         """
-        Batch fetch descriptions from 'sentient_entities_fallback'.
+        Descriptions for qids from 'sentient_entities_fallback'.
+        Served from the LRU when possible; misses are queued for the shared
+        mget batcher, and a QID already in flight is awaited, not re-queued.
         """
+        descriptions = {}
+        pending = {}
+        for qid in qids:
+            desc = self._desc_cache.get(qid)
+            if desc is not None:
+                descriptions[qid] = desc
+            elif qid not in pending:
+                pending[qid] = self._request_description(qid)
+
+        if pending:
+            fetched = await asyncio.gather(*pending.values())
+            descriptions.update(zip(pending, fetched))
+        return descriptions
+
+    def _request_description(self, qid):
+        """Returns the Future resolving to qid's description, queueing it if needed."""
+        fut = self._desc_inflight.get(qid)
+        if fut is None:
+            if self._desc_batcher is None or self._desc_batcher.done():
+                self._desc_queue = asyncio.Queue()
+                self._desc_batcher = asyncio.create_task(self._description_batcher())
+            fut = asyncio.get_running_loop().create_future()
+            self._desc_inflight[qid] = fut
+            self._desc_queue.put_nowait(qid)
+        return fut
+
+    async def _description_batcher(self):
+        """Background task: drains the queue every DESC_BATCH_WINDOW into one mget."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._desc_queue.get()]
+            deadline = loop.time() + DESC_BATCH_WINDOW
+            while len(batch) < DESC_BATCH_MAX:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._desc_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._mget_descriptions(batch)
+
+    async def _mget_descriptions(self, qids):
+        """One mget for a coalesced batch; resolves (and clears) every waiting Future."""
         try:
-            response = self.es_client.mget(index=self.ent_index, body={"ids": qids})
+            response = await self.es_client.mget(
+                index=self.ent_index, body={"ids": qids}, _source_includes=["description", "label"]
+            )
             descriptions = {}
             for doc in response['docs']:
                 if doc['found']:
@@ -152,10 +277,37 @@ class FalconPipeline:
                     descriptions[doc['_id']] = src.get('description') or src.get('label') or ""
                 else:
                     descriptions[doc['_id']] = ""
-            return descriptions
+            self._desc_cache.update(descriptions)
         except Exception as e:
+            # Not cached: the next request for these QIDs retries Elastic
             logger.error(f"ElasticSearch fetch failed: {e}")
-            return {qid: "" for qid in qids}
+            descriptions = {}
+
+        for qid in qids:
+            fut = self._desc_inflight.pop(qid)
+            if not fut.done():
+                fut.set_result(descriptions.get(qid, ""))
+
+    def _encode_text(self, text):
+        """Encodes a single free-text string (the surface form fallback) through the LRU."""
+        vec = self._cache_get(self._ctx_cache, text)
+        if vec is None:
+            vec = self.embedder.encode(text, convert_to_tensor=True)
+            self._cache_put(self._ctx_cache, text, vec)
+        return vec
+
+    def _cache_get(self, cache, key):
+        """LRU lookup: returns the cached vector (refreshing its recency) or None."""
+        vec = cache.get(key)
+        if vec is not None:
+            cache.move_to_end(key)
+        return vec
+
+    def _cache_put(self, cache, key, vec):
+        """LRU insert: evicts the least recently used entry once the cache is full."""
+        cache[key] = vec
+        if len(cache) > self._vector_cache_size:
+            cache.popitem(last=False)
 
     def _generate_reason(self, score):
         """Generates a human-readable explanation for the UI Confidence Bar."""
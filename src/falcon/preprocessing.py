@@ -1,9 +1,38 @@
 import re
 import os
+import pickle
 import logging
 
 logger = logging.getLogger("nlp_falcon")
 
+def load_stopwords(stopwords_path):
+    """
+    Parses a stopword list (one word per line, '#' comments) into a frozenset.
+    The parsed set is pickled next to the text file ('<file>.pkl') and reused on
+    later boots for as long as it is newer than the source.
+    Raises FileNotFoundError if the text file is missing.
+    """
+    cache_path = stopwords_path + ".pkl"
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(stopwords_path):
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass  # No (usable) cache yet: parse the text file below
+
+    with open(stopwords_path, 'r', encoding='utf-8') as f:
+        # Skip comments and empty lines
+        words = (line.strip().lower() for line in f)
+        stopwords = frozenset(word for word in words if word and not word.startswith('#'))
+
+    try:
+        with open(cache_path, 'wb') as f:
+            pickle.dump(stopwords, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        logger.debug(f"Could not write stopwords cache {cache_path}: {e}")
+
+    return stopwords
+
 class FalconPreprocessor:
     """
     Phase A: The 'Compression' Engine.
@@ -18,7 +47,7 @@ class FalconPreprocessor:
         :param config: The loaded dictionary from 'falcon_settings.yaml'.
         """
         self.config = config
-        self.stopwords = set()
+        self.stopwords = frozenset()
         
         # 1. Load Stopwords
         # We load the extended stopword list to filter structural noise (e.g., 'http', 'null')
@@ -47,15 +76,8 @@ class FalconPreprocessor:
         stopwords_path = os.path.join(os.getcwd(), relative_path)
 
         try:
-            with open(stopwords_path, 'r', encoding='utf-8') as f:
-                count = 0
-                for line in f:
-                    word = line.strip().lower()
-                    # Skip comments and empty lines
-                    if word and not word.startswith('#'):
-                        self.stopwords.add(word)
-                        count += 1
-            logger.info(f"Preprocessor loaded {count} stopwords from {relative_path}")
+            self.stopwords = load_stopwords(stopwords_path)
+            logger.info(f"Preprocessor loaded {len(self.stopwords)} stopwords from {relative_path}")
         except FileNotFoundError:
             logger.warning(f"Stopwords file not found at {stopwords_path}. Compression disabled.")
 
@@ -69,23 +91,15 @@ class FalconPreprocessor:
         Input:  ["The", "Hilton", "hotel", "is", "expensive", "."]
         Output: ["Hilton", "hotel", "expensive"]
         """
-        cleaned_tokens = []
-        
-        for token in context_tokens:
-            # 1. Normalize (Lowercase)
-            token_lower = token.lower()
-            
-            # 2. Clean Punctuation
-            # "hotel," -> "hotel"
-            token_clean = self.clean_regex.sub("", token_lower)
-            
-            # 3. Filter
-            # Must not be empty and must not be a stopword
-            if token_clean and token_clean not in self.stopwords:
-                # We return the lowercased, cleaned version for consistency with SBERT
-                cleaned_tokens.append(token_clean)
-                
-        return cleaned_tokens
+        # 1. Normalize (Lowercase) + 2. Clean Punctuation ("hotel," -> "hotel")
+        # Done once over the whole window instead of per token.
+        text = self.clean_regex.sub("", " ".join(context_tokens).lower())
+
+        # 3. Filter
+        # split() drops the empties; stopwords are removed via frozenset lookup.
+        # We return the lowercased, cleaned version for consistency with SBERT
+        stopwords = self.stopwords
+        return [token for token in text.split() if token not in stopwords]
 
     def generate_ngrams(self, tokens, n_min=1, n_max=6):
         """
@@ -97,10 +111,14 @@ class FalconPreprocessor:
         """
         ngrams = []
         count = len(tokens)
-        
-        for n in range(n_min, n_max + 1):
-            for i in range(count - n + 1):
-                ngram = " ".join(tokens[i : i + n])
-                ngrams.append(ngram)
-                
+
+        # Each n-gram is the (n-1)-gram at the same offset plus one token,
+        # so no window is ever re-sliced and re-joined from scratch.
+        grams = list(tokens)
+        for n in range(1, n_max + 1):
+            if n > 1:
+                grams = [grams[i] + " " + tokens[i + n - 1] for i in range(count - n + 1)]
+            if n >= n_min:
+                ngrams.extend(grams)
+
         return ngrams
\ No newline at end of file
@@ -0,0 +1,62 @@
+import logging
+
+import numpy as np
+
+try:
+    import simsimd
+except ImportError:  # Falls back to the torch matmul
+    simsimd = None
+
+logger = logging.getLogger("nlp_falcon")
+
+HAS_SIMSIMD = simsimd is not None
+
+def quantize_int8(vector):
+    """
+    Symmetric int8 quantization of one embedding (torch tensor or numpy array).
+    Cosine is scale-invariant, so the per-vector scale is not kept: 384 bytes
+    per MiniLM vector instead of 1.5 KB in fp32.
+    """
+    v = np.asarray(vector.float().cpu().numpy() if hasattr(vector, 'cpu') else vector, dtype=np.float32)
+    peak = float(np.abs(v).max())
+    if peak == 0.0:
+        return np.zeros(v.shape, dtype=np.int8)
+    return np.round(v / peak * 127).astype(np.int8)
+
+def cosine_scores(vectors_b, vector_a):
+    """
+    Phase C reduction: cosine similarity of every candidate row of vectors_b
+    (N x D) against the context vector_a (D,), clamped to [0, 1].
+    Both sides must already be L2-normalized (encode(normalize_embeddings=True)),
+    unless vectors_b is an int8 matrix from quantize_int8(), in which case
+    vector_a is quantized the same way and SimSIMD's i8 cosine kernel is used.
+
+    On CPU the N x D block fits in L1, so SimSIMD's SIMD kernels beat torch's
+    matmul dispatch; without SimSIMD (or on GPU) it is one torch matmul.
+
+    :return: List of N floats, in candidate order.
+    """
+    if isinstance(vectors_b, np.ndarray):
+        # int8 path (only enabled when SimSIMD is installed)
+        qa = quantize_int8(vector_a)
+        distances = np.asarray(simsimd.cdist(qa[None, :], vectors_b, metric="cosine"))
+        return np.clip(1.0 - distances[0], 0.0, 1.0).tolist()
+
+    if simsimd is not None and vectors_b.device.type == 'cpu':
+        vb = np.ascontiguousarray(vectors_b.float().numpy(), dtype=np.float32)
+        va = np.ascontiguousarray(vector_a.float().numpy(), dtype=np.float32)
+        distances = np.asarray(simsimd.cdist(va[None, :], vb, metric="cosine"))
+        return np.clip(1.0 - distances[0], 0.0, 1.0).tolist()
+
+    return (vectors_b @ vector_a.to(vectors_b.dtype)).clamp_(0.0, 1.0).cpu().tolist()
+
+def int8_cosine_error(vectors):
+    """
+    Max |cosine(fp32) - cosine(int8)| over all pairs of the given L2-normalized
+    vectors (N x D numpy array). Used to validate int8 storage before enabling it.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    exact = vectors @ vectors.T
+    q = np.stack([quantize_int8(v) for v in vectors]).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True).clip(min=1e-12)
+    return float(np.abs(exact - q @ q.T).max())
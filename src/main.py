@@ -1,11 +1,27 @@
 import os
+import copy
 import yaml
+import asyncio
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import numpy as np
-from flask import Flask, request, jsonify
-from sentence_transformers import SentenceTransformer, util
+import orjson
+import torch
+import torch.nn.functional as F
+import uvicorn
+from cachetools import TTLCache
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from sentence_transformers import SentenceTransformer
 from elasticsearch import Elasticsearch, NotFoundError
-from werkzeug.exceptions import BadRequest
+
+from src.falcon.hardware import cpu_has_flag
+from src.falcon.onnx_embedder import OnnxEmbedder
+from src.falcon.preprocessing import load_stopwords
+from src.falcon.similarity import HAS_SIMSIMD, cosine_scores, int8_cosine_error, quantize_int8
 
 # ==============================================================================
 # 1. SETUP & CONFIGURATION
@@ -36,72 +52,431 @@ except Exception as e:
     logger.critical(f"Failed to load settings: {e}")
     exit(1)
 
-# Initialize Flask
-app = Flask(__name__)
+# Torch Threading
+# One process serves every request, so intra-op parallelism gets all cores
+# (server.torch_threads, default os.cpu_count()) and inter-op stays at 1 to
+# avoid oversubscription.
+# Grad mode is thread-local: this only covers the import-time encodes below
+# (calibration, warmup). Request encodes run on executor / collator threads and
+# are covered by the @torch.inference_mode() decorators instead.
+# Note: OMP_NUM_THREADS / MKL_NUM_THREADS are read when numpy/torch are first
+# imported, so they must be set in the environment (Dockerfile / compose),
+# not here.
+torch.set_num_threads(config['server'].get('torch_threads') or os.cpu_count())
+torch.set_num_interop_threads(1)
+torch.set_grad_enabled(False)
+
+# Initialize FastAPI (ASGI)
+app = FastAPI(title="SenTient Falcon 2.0")
 
 # ==============================================================================
 # 2. GLOBAL RESOURCES (Lazy Loading Pattern)
 # ==============================================================================
 
+# Short, deliberately ambiguous sentences used to check that a cheaper numeric
+# format (bf16 weights, int8 vectors) stays close to the fp32 cosines.
+CALIBRATION_SENTENCES = [
+    "Paris is the capital of France.", "Paris Hilton is an American media personality.",
+    "Apple Inc. is a technology company.", "The apple is the fruit of the apple tree.",
+    "Jaguar is a British car manufacturer.", "The jaguar is a large cat of the Americas.",
+    "Mercury is the smallest planet.", "Mercury is a chemical element.",
+    "Amazon is an American e-commerce company.", "The Amazon is the largest river in South America.",
+    "Java is a programming language.", "Java is an island of Indonesia.",
+    "Python is a high-level programming language.", "The python is a large constricting snake.",
+    "Washington was the first president of the United States.", "Washington is a state in the Pacific Northwest.",
+    "Georgia is a country in the Caucasus.", "Georgia is a state in the southeastern United States.",
+    "Turkey is a transcontinental country.", "The turkey is a large bird native to North America.",
+    "Orange is a French telecommunications company.", "Orange is the color between red and yellow.",
+    "Mars is the fourth planet from the Sun.", "Mars is the Roman god of war.",
+    "Buried in Père Lachaise Cemetery.", "Born in Vienna, Austria.",
+    "Mayor of Paris since 2014.", "Chief executive officer of Google.",
+    "Played for Manchester United.", "Author of Pride and Prejudice.",
+    "Founded in 1998 in Menlo Park.", "Directed by Steven Spielberg.",
+]
+
 # A. Sentence-BERT Model
 # Loaded into memory once on startup to handle the vector math.
 # Configured in falcon_settings.yaml (default: all-MiniLM-L6-v2)
 logger.info(f"Loading Embedding Model: {config['embeddings']['model_name']}...")
+embedding_backend = config['embeddings'].get('backend', 'torch')
 model_device = config['embeddings']['device']
-embedder = SentenceTransformer(config['embeddings']['model_name'], device=model_device)
+if model_device == 'auto':
+    # GPU whenever one is visible (the ONNX backend is CPU only)
+    model_device = 'cuda' if embedding_backend == 'torch' and torch.cuda.is_available() else 'cpu'
+    logger.info(f"Auto-selected device: {model_device}")
+if embedding_backend == 'onnx':
+    # [PERFORMANCE] ONNX Runtime: fused graph + int8 weights, CPU only
+    embedder = OnnxEmbedder(
+        config['embeddings']['model_name'],
+        cache_dir=os.path.join(BASE_DIR, config['embeddings']['cache_dir'])
+    )
+else:
+    embedder = SentenceTransformer(config['embeddings']['model_name'], device=model_device)
+    embedder.eval()
+    # [PERFORMANCE] FP16 weights on GPU (tensor cores, half the memory bandwidth)
+    if model_device.startswith('cuda'):
+        embedder.half()
 logger.info("Model loaded successfully.")
 
+# Optional re-ranker for ?mode=accurate (falcon_settings.yaml: embeddings.quality_model).
+# Never on the default path: the online model above stays the small one.
+quality_embedder = None
+QUALITY_TOP_K = config['embeddings'].get('quality_top_k', 10)
+if config['embeddings'].get('quality_model'):
+    logger.info(f"Loading Quality Model: {config['embeddings']['quality_model']}...")
+    quality_embedder = SentenceTransformer(config['embeddings']['quality_model'], device=model_device)
+    quality_embedder.eval()
+    if model_device.startswith('cuda'):
+        quality_embedder.half()
+
+# Mini-batch size for candidate encoding (falcon_settings.yaml: embeddings.batch_size)
+ENCODE_BATCH_SIZE = config['embeddings'].get('batch_size', 32)
+# Stored ES vectors are only usable if they come from a model of the same width
+EMBED_DIM = embedder.get_sentence_embedding_dimension()
+
+# [PERFORMANCE] Dynamic int8 quantization of the transformer's Linear layers.
+# quantize_dynamic only has CPU kernels, so GPU deployments keep FP32.
+# (The ONNX backend ships its own int8 graph.)
+if embedding_backend == 'torch' and config['embeddings'].get('quantize') == 'int8' and model_device == 'cpu':
+    embedder[0].auto_model = torch.quantization.quantize_dynamic(
+        embedder[0].auto_model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    logger.info("Embedding model quantized to int8 (dynamic, Linear layers).")
+
+# [PERFORMANCE] BF16 weights on CPUs with native AVX512-BF16 (same exponent range
+# as FP32, half the bandwidth). Skipped when the weights are already int8, and
+# kept only if the max cosine drift against FP32 on the calibration set stays
+# under embeddings.bf16_max_drift. Otherwise the original FP32 weights are
+# restored from a copy (casting back would keep them rounded to bf16).
+elif (embedding_backend == 'torch' and model_device == 'cpu'
+        and torch.backends.mkldnn.is_available() and cpu_has_flag("avx512_bf16")):
+    _max_drift = config['embeddings'].get('bf16_max_drift', 0.02)
+    _fp32_state = copy.deepcopy(embedder.state_dict())
+    _fp32 = embedder.encode(CALIBRATION_SENTENCES, convert_to_tensor=True, normalize_embeddings=True)
+    embedder.to(dtype=torch.bfloat16)
+    _bf16 = embedder.encode(CALIBRATION_SENTENCES, convert_to_tensor=True, normalize_embeddings=True).float()
+    _drift = float(((_fp32 @ _fp32.T) - (_bf16 @ _bf16.T)).abs().max())
+    if _drift < _max_drift:
+        logger.info(f"Embedding model cast to bfloat16 (max cosine drift {_drift:.5f}).")
+    else:
+        embedder.to(dtype=torch.float32)
+        embedder.load_state_dict(_fp32_state)
+        logger.info(f"Keeping float32 weights (bfloat16 cosine drift {_drift:.5f} >= {_max_drift}).")
+    del _fp32_state
+
+# On GPU the FP16 model above; let any remaining FP32 matmuls use TF32 tensor cores
+if model_device.startswith('cuda'):
+    torch.backends.cuda.matmul.allow_tf32 = True
+
+# Warmup: one forward pass on the final (quantized / cast) model at import, so
+# kernel selection and allocator growth don't land on the first request.
+# The model is a module-level singleton of the single worker process.
+with torch.inference_mode():
+    embedder.encode("warmup", convert_to_tensor=True, normalize_embeddings=True)
+
 # B. ElasticSearch Connection
 # Used for Context Property lookups and Candidate Description fetching.
 es_hosts = config['elasticsearch']['hosts']
 es_client = Elasticsearch(
     hosts=es_hosts,
     request_timeout=config['elasticsearch']['connection']['timeout'],
-    max_retries=config['elasticsearch']['connection']['max_retries']
+    max_retries=config['elasticsearch']['connection']['max_retries'],
+    # gzip request bodies (query vectors, id lists) on the wire
+    http_compress=True
 )
 
 # C. Stopwords List
 # Critical for the "Compression" phase of the pipeline.
-stopwords = set()
 stopwords_rel_path = config['preprocessing']['stopwords_file']
 STOPWORDS_PATH = os.path.join(BASE_DIR, stopwords_rel_path)
 
 try:
-    with open(STOPWORDS_PATH, 'r', encoding='utf-8') as f:
-        for line in f:
-            word = line.strip().lower()
-            if word and not word.startswith('#'):
-                stopwords.add(word)
+    # Shared loader: reuses the pickled frozenset when it is up to date
+    stopwords = load_stopwords(STOPWORDS_PATH)
     logger.info(f"Loaded {len(stopwords)} stopwords from {STOPWORDS_PATH}")
 except FileNotFoundError:
+    stopwords = frozenset()
     logger.warning(f"Stopwords file not found at {STOPWORDS_PATH}. Proceeding without filter.")
 
+# Where candidate cosines are computed: "python" (here) or "elastic"
+# (script_score over the stored 'description_vector', see rank_in_elastic)
+ELASTIC_SCORING = config['ranking']['context'].get('vector_scoring', 'python') == 'elastic'
+if ELASTIC_SCORING:
+    # cosineSimilarity() only works on a dense_vector field (mapped by
+    # src/falcon/index_vectors.py); checked once so requests don't each pay
+    # for a failing search.
+    try:
+        _field_mappings = es_client.indices.get_field_mapping(
+            index=config['elasticsearch']['indexes']['entities'], fields="description_vector"
+        )
+        _field_types = {
+            field['mapping']['description_vector'].get('type')
+            for index_mapping in _field_mappings.values()
+            for field in index_mapping['mappings'].values()
+        }
+    except Exception as e:
+        _field_types = {f"unreadable ({e})"}
+    if _field_types != {'dense_vector'}:
+        ELASTIC_SCORING = False
+        logger.warning(f"'description_vector' is not a dense_vector (found: {_field_types or 'no mapping'}); "
+                       "scoring candidates in Python. Run src/falcon/index_vectors.py.")
+
+# D. Candidate Vector Cache
+# Descriptions are effectively static per QID, so their (L2-normalized) vectors
+# are kept in a bounded LRU keyed by (qid, text); a changed description misses.
+# Requests run concurrently on the executor, hence the lock.
+QID_VEC_CACHE_SIZE = config['embeddings'].get('vector_cache_size', 50000)
+_qid_vec_cache = OrderedDict()
+_qid_vec_lock = threading.Lock()
+
+# Optional int8 storage for the cache (4x smaller, SimSIMD i8 cosine kernel).
+# Only switched on after the quantization error on a calibration set is < 1e-2.
+INT8_VECTORS = False
+if config['embeddings'].get('int8_vectors', False):
+    if not HAS_SIMSIMD:
+        logger.warning("embeddings.int8_vectors needs simsimd; keeping float vectors.")
+    else:
+        _calibration = embedder.encode(
+            CALIBRATION_SENTENCES, convert_to_tensor=True, normalize_embeddings=True,
+            show_progress_bar=False
+        ).float().cpu().numpy()
+        _int8_error = int8_cosine_error(_calibration)
+        INT8_VECTORS = _int8_error < 1e-2
+        logger.info(f"int8 vector cache {'enabled' if INT8_VECTORS else 'disabled'} "
+                    f"(max cosine error {_int8_error:.4f})")
+
+# Query Vector Cache
+# Paging through candidates repeats the same surface form + context: vector_a
+# is memoized under a 16-byte blake2b digest of the input text, trading a few
+# MB for skipping those duplicate query encodes (falcon_settings.yaml:
+# embeddings.query_cache_size / query_cache_ttl). TTLCache is not thread-safe.
+_query_vec_cache = TTLCache(
+    maxsize=config['embeddings'].get('query_cache_size', 10000),
+    ttl=config['embeddings'].get('query_cache_ttl', 3600)
+)
+_query_vec_lock = threading.Lock()
+
+LOW_OVERLAP_REASON = "Low context overlap"
+
+# E. Request-level Encode Batching
+# Texts from concurrent requests are collected for server.batch_window_ms and
+# encoded in one forward pass (see encode_collator). Queue and task live on
+# the server's event loop and are created at startup.
+# The forward pass runs on its own thread, never on the default executor:
+# run_disambiguation blocks default-executor threads while waiting for its
+# vectors, so sharing that pool would deadlock once it is saturated.
+BATCH_WINDOW = config['server'].get('batch_window_ms', 5) / 1000.0
+# Upper bound on a request's wait for its vectors (server.timeout)
+ENCODE_TIMEOUT = config['server'].get('timeout', 300)
+_server_loop = None
+_encode_queue = None
+_encode_collator = None
+_encode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="falcon-sbert")
+
 # ==============================================================================
 # 3. HELPER FUNCTIONS
 # ==============================================================================
 
-def preprocess_context(context_tokens):
+@torch.inference_mode()
+def encode_texts(texts):
+    """One batched forward pass; L2-normalized (N x D) tensor in input order."""
+    return embedder.encode(
+        texts,
+        batch_size=ENCODE_BATCH_SIZE,
+        convert_to_tensor=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+
+async def encode_collator():
     """
-    Pipeline Phase A: Compression
-    Cleans the context window by removing stopwords defined in falcon_extended_en.txt.
-    This increases the density of semantic signals (e.g., keeping "Mayor", "Paris" vs "The", "of").
+    Background task: drains the queue every BATCH_WINDOW, encodes the texts of
+    every waiting request in a single encode_texts() call (on _encode_executor)
+    and hands each request its own rows through its Future.
     """
-    return [
-        word for word in context_tokens 
-        if word.lower() not in stopwords
-    ]
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _encode_queue.get()]
+        deadline = loop.time() + BATCH_WINDOW
+        while sum(len(texts) for texts, _ in batch) < ENCODE_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_encode_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            vectors = await loop.run_in_executor(_encode_executor, encode_texts, texts)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+        rows = torch.split(vectors, [len(request_texts) for request_texts, _ in batch])
+        for (_, fut), request_rows in zip(batch, rows):
+            if not fut.done():
+                fut.set_result(request_rows)
 
-def fetch_candidate_descriptions(candidate_ids):
+async def enqueue_texts(texts):
+    """
+    Queues one request's texts for the collator; resolves to their vectors.
+    Restarts the collator task if it has died, so queued requests still drain.
+    """
+    global _encode_collator
+    if _encode_collator is None or _encode_collator.done():
+        if _encode_collator is not None and not _encode_collator.cancelled():
+            logger.error(f"Encode collator stopped ({_encode_collator.exception()!r}); restarting it.")
+        _encode_collator = asyncio.create_task(encode_collator())
+    fut = asyncio.get_running_loop().create_future()
+    _encode_queue.put_nowait((texts, fut))
+    return await fut
+
+def encode_batched(texts):
+    """
+    Blocking entry point for run_disambiguation (executor thread): encodes
+    texts through the collator, or directly when no server loop is running.
+    """
+    if _server_loop is None:
+        return encode_texts(texts)
+    pending = asyncio.run_coroutine_threadsafe(enqueue_texts(texts), _server_loop)
+    try:
+        return pending.result(timeout=ENCODE_TIMEOUT)
+    except FutureTimeoutError:
+        pending.cancel()
+        raise TimeoutError(f"No vectors from the encode collator after {ENCODE_TIMEOUT}s")
+
+def stored_vector(values):
+    """
+    Converts a 'description_vector' from ES into a normalized vector in the
+    same representation as encoded ones, or None if it has the wrong width.
+    """
+    if not values or len(values) != EMBED_DIM:
+        return None
+    vec = F.normalize(torch.tensor(values, dtype=torch.float32, device=embedder.device), dim=0)
+    return quantize_int8(vec) if INT8_VECTORS else vec
+
+def encode_candidates(qids, texts, stored_vectors=None, query_text=None):
+    """
+    Returns the stacked, L2-normalized candidate vectors for qids/texts
+    (an int8 numpy matrix when INT8_VECTORS is on, a torch tensor otherwise).
+    Vectors pre-computed in ES (stored_vectors: qid -> list) are used as-is,
+    cached vectors are reused; only the rest go through one batched encode,
+    each distinct text once (e.g. all description-less candidates share the
+    surface form). query_text, if given, rides in that same batch, so the
+    request waits for a single collator window.
+    :return: (candidate vectors, query vector or None)
+    """
+    stored_vectors = stored_vectors or {}
+    keys = list(zip(qids, texts))
+    vectors = [stored_vector(stored_vectors.get(qid)) for qid in qids]
+    with _qid_vec_lock:
+        for i, key in enumerate(keys):
+            if vectors[i] is not None:
+                continue
+            vec = _qid_vec_cache.get(key)
+            if vec is not None:
+                _qid_vec_cache.move_to_end(key)
+            vectors[i] = vec
+
+    missing = [i for i, vec in enumerate(vectors) if vec is None]
+    unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+    pending = unique_texts + ([query_text] if query_text is not None else [])
+    query_vec = None
+    if pending:
+        # encode() length-sorts a list input internally, so each mini-batch only
+        # pads to its own longest description (smart batching). Shared with the
+        # other in-flight requests through the collator.
+        encoded = encode_batched(pending)
+        if query_text is not None:
+            query_vec = encoded[-1]
+        fresh = encoded[:len(unique_texts)]
+    if missing:
+        slot = {text: j for j, text in enumerate(unique_texts)}
+        if INT8_VECTORS:
+            fresh = [quantize_int8(vec) for vec in fresh]
+        else:
+            # Rows are views of the whole (cross-request) encode batch: copy them,
+            # or every cache entry would keep that batch alive
+            fresh = [vec.clone() for vec in fresh]
+        with _qid_vec_lock:
+            for i in missing:
+                vec = fresh[slot[texts[i]]]
+                vectors[i] = vec
+                _qid_vec_cache[keys[i]] = vec
+                if len(_qid_vec_cache) > QID_VEC_CACHE_SIZE:
+                    _qid_vec_cache.popitem(last=False)
+
+    # int8 rows stack into a numpy matrix; cosine_scores() dispatches on it.
+    # Stored vectors are float32, so the torch stack is promoted to match them.
+    if INT8_VECTORS:
+        return np.stack(vectors), query_vec
+    return torch.stack([vec.float() for vec in vectors]), query_vec
+
+def rank_in_elastic(qids, vector_a):
+    """
+    Server-side scoring: cosine of vector_a against each candidate's stored
+    'description_vector', computed by a script_score query inside Elastic.
+    :return: Scores in qids order (clamped to 0-1), or None when not every
+             candidate has a stored vector (caller falls back to local scoring).
+    """
+    index_name = config['elasticsearch']['indexes']['entities']
+    query = {
+        "query": {
+            "script_score": {
+                "query": {
+                    "bool": {
+                        "filter": [
+                            {"ids": {"values": qids}},
+                            {"exists": {"field": "description_vector"}}
+                        ]
+                    }
+                },
+                # +1.0 keeps the score non-negative, as Lucene requires
+                "script": {
+                    "source": "cosineSimilarity(params.qv, 'description_vector') + 1.0",
+                    "params": {"qv": vector_a.float().cpu().tolist()}
+                }
+            }
+        },
+        "size": len(qids),
+        "_source": False
+    }
+
+    try:
+        res = es_client.search(index=index_name, body=query)
+    except Exception as e:
+        logger.warning(f"Elastic vector scoring failed, scoring locally: {e}")
+        return None
+
+    hits = res['hits']['hits']
+    if len(hits) < len(qids):
+        return None
+    scores = {hit['_id']: hit['_score'] - 1.0 for hit in hits}
+    return [max(0.0, min(1.0, scores[qid])) for qid in qids]
+
+def fetch_candidate_descriptions(candidate_ids, include_vectors=True):
     """
     Retrieves candidate descriptions from the 'sentient_entities_fallback' index.
     Used because the Java request provides IDs (Q-items), but we need text for vectorization.
+    Also returns the pre-computed 'description_vector' of every candidate that
+    has one (filled offline by src/falcon/index_vectors.py).
+    :return: (qid -> description, qid -> stored vector list)
     """
     index_name = config['elasticsearch']['indexes']['entities']
     
-    # Use mget for efficiency (Single Round Trip)
+    # Use mget for efficiency (Single Round Trip), returning only the fields we read
+    source_fields = ["description", "label", "description_vector"] if include_vectors else ["description", "label"]
     try:
-        response = es_client.mget(index=index_name, body={"ids": candidate_ids})
+        response = es_client.mget(
+            index=index_name,
+            body={"ids": candidate_ids},
+            _source_includes=source_fields
+        )
         descriptions = {}
+        vectors = {}
         for doc in response['docs']:
             if doc['found']:
                 # Prefer 'description', fallback to 'label' if description missing
@@ -109,31 +484,61 @@ def fetch_candidate_descriptions(candidate_ids):
                 if not desc:
                     desc = doc['_source'].get('label', '')
                 descriptions[doc['_id']] = desc
+                if doc['_source'].get('description_vector'):
+                    vectors[doc['_id']] = doc['_source']['description_vector']
             else:
                 descriptions[doc['_id']] = "" # Fallback if missing in ES
-        return descriptions
+        return descriptions, vectors
     except Exception as e:
         logger.error(f"ElasticSearch mget failed: {e}")
-        return {qid: "" for qid in candidate_ids}
+        return {qid: "" for qid in candidate_ids}, {}
 
-def extract_inferred_property(context_tokens):
+def rescore_top_k(input_text, texts, scores):
     """
-    Pipeline Phase B: Edge Detection
-    Scans the context N-Grams against 'sentient_properties_v1' to find predicates.
-    e.g., "buried in" -> P119. This allows Falcon to boost 'Location' entities over 'People'.
+    Second pass for mode=accurate: the QUALITY_TOP_K best candidates of the
+    online model are re-scored with quality_embedder; the rest keep their score.
+    The two models score on different scales, so the quality model only
+    re-orders within the top K, which stays ranked above every other candidate.
+    :return: (scores, candidate indices best first)
     """
-    index_name = config['elasticsearch']['indexes']['properties']
-    window = " ".join(context_tokens)
-    
-    if not window.strip():
-        return None
+    scores = list(scores)
+    ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+    top, rest = ranked[:QUALITY_TOP_K], ranked[QUALITY_TOP_K:]
+    query = quality_embedder.encode(input_text, convert_to_tensor=True, normalize_embeddings=True)
+    docs = quality_embedder.encode(
+        [texts[i] for i in top],
+        batch_size=ENCODE_BATCH_SIZE,
+        convert_to_tensor=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    for i, score in zip(top, (docs @ query).clamp_(0, 1).tolist()):
+        scores[i] = score
+    top.sort(key=scores.__getitem__, reverse=True)
+    return scores, top + rest
+
+def analyze_context(raw_context):
+    """
+    Pipeline Phases A + B in a single pass over the context window.
+    Phase A (Compression): drops the stopwords defined in falcon_extended_en.txt,
+    keeping the dense semantic signals (e.g., "Mayor", "Paris" vs "The", "of").
+    Phase B (Edge Detection): the compressed window is matched against
+    'sentient_properties_v1' (e.g., "buried in" -> P119, to boost 'Location'
+    entities over 'People').
+    :return: (clean_tokens, context_str, inferred_pid)
+    """
+    clean_tokens = [word for word in raw_context if word.lower() not in stopwords]
+    context_str = " ".join(clean_tokens)
+    if not context_str.strip():
+        return clean_tokens, context_str, None
 
     # Fuzzy match query to handle slight variations
+    index_name = config['elasticsearch']['indexes']['properties']
     query = {
         "query": {
             "match": {
                 "label": {
-                    "query": window,
+                    "query": context_str,
                     "fuzziness": "AUTO"
                 }
             }
@@ -141,119 +546,167 @@ def extract_inferred_property(context_tokens):
         "size": 1
     }
     
+    inferred_pid = None
     try:
         res = es_client.search(index=index_name, body=query)
         if res['hits']['hits']:
             # Return the PID (e.g., P31)
-            return res['hits']['hits'][0]['_source'].get('pid')
+            inferred_pid = res['hits']['hits'][0]['_source'].get('pid')
     except Exception as e:
         logger.error(f"Property extraction failed: {e}")
     
-    return None
+    return clean_tokens, context_str, inferred_pid
+
+@torch.inference_mode()
+def run_disambiguation(payload, mode="fast"):
+    """
+    Pipeline Phases A-C for a single request payload.
+    Blocking (ElasticSearch round trips + SBERT encoding), so the async endpoint
+    runs it on the default executor instead of on the event loop.
+    mode="accurate" adds the quality_model re-scoring pass (if one is configured).
+    """
+    # 1. Parse Input
+    surface_form = payload.get('surface_form', '')
+    raw_context = payload.get('context_window', [])
+    candidate_ids = payload.get('candidates', [])
+    limit_req = payload.get('limit', 3)
+    
+    # Enforce CPU safety limit [config/nlp/falcon_settings.yaml]
+    max_c = config['thresholds']['max_candidates']
+    process_limit = min(limit_req, max_c)
+    candidates_to_process = candidate_ids[:process_limit]
+
+    if not candidates_to_process:
+        return {"ranked_candidates": [], "inferred_property": None}
+
+    # 2. Pipeline Phase A: Compression (remove stopwords to densify the semantic signal)
+    # 3. Pipeline Phase B: Edge Detection (does the context imply a property, e.g. "born in"?)
+    clean_context, context_str, inferred_pid = analyze_context(raw_context)
+
+    # 4. Pipeline Phase C: Vector Scoring
+    # 4a. Fetch Descriptions (The "B" Vectors)
+    # (With Elastic-side scoring the vectors stay in Elastic)
+    descriptions_map, stored_vectors = fetch_candidate_descriptions(
+        candidates_to_process, include_vectors=not ELASTIC_SCORING
+    )
+    
+    # 4b. "Context" (Vector A)
+    # We augment the context with the surface form for better grounding
+    # e.g. "Paris [SEP] Hilton hotel expensive"
+    # On a cache miss it is encoded in the same batch as the candidates (4c).
+    input_text = f"{surface_form} {context_str}"
+    query_key = hashlib.blake2b(input_text.encode(), digest_size=16).digest()
+    with _query_vec_lock:
+        vector_a = _query_vec_cache.get(query_key)
+    query_cached = vector_a is not None
+
+    # 4c. Encode "Candidates" (Vector B) in one batched forward pass
+    # Pre-calculated vectors from ES are used where present; the rest are
+    # calculated on-the-fly, so a partial index never breaks a request.
+    # "desc or surface_form" ensures we have something to encode.
+    qids = list(candidates_to_process)
+    texts = [descriptions_map.get(qid) or surface_form for qid in qids]
+    scores = None
+    if ELASTIC_SCORING:
+        # Elastic needs vector A up front; candidates are only encoded on fallback
+        if vector_a is None:
+            vector_a = encode_batched([input_text])[0]
+        scores = rank_in_elastic(qids, vector_a)
+
+    if scores is None:
+        vectors_b, query_vec = encode_candidates(
+            qids, texts, stored_vectors, query_text=None if vector_a is not None else input_text
+        )
+        if vector_a is None:
+            vector_a = query_vec
+
+        # 4d. Cosine Similarity: both sides are L2-normalized, so cosine is a plain
+        # dot product over all N candidates at once, normalized to 0-1
+        scores = cosine_scores(vectors_b, vector_a)
+
+    if not query_cached:
+        # A copy: vector_a is a row view of the collator's cross-request batch
+        with _query_vec_lock:
+            _query_vec_cache[query_key] = vector_a.clone()
+
+    # 4e. Optional second pass with the larger model (fixes the ranking order)
+    order = None
+    if mode == "accurate" and quality_embedder is not None:
+        scores, order = rescore_top_k(input_text, texts, scores)
+
+    # Rounding in one numpy call; only the "X%" reason needs formatting
+    rounded = np.round(scores, 4)
+    # Simple reasoning generation for the UI "Confidence Bar"
+    reasons = [f"Context match: {int(s*100)}%" if s > 0.4 else LOW_OVERLAP_REASON for s in scores]
+
+    # 5. Sort and Return
+    # argsort on the scores, then the response dicts are built once, already in
+    # order (stable, so ties keep the request order as before)
+    if order is None:
+        order = np.argsort(-rounded, kind="stable")
+    ranked_results = [
+        {"id": qids[i], "falcon_score": float(rounded[i]), "semantic_reason": reasons[i]}
+        for i in order
+    ]
+    
+    return {
+        "inferred_property": inferred_pid,
+        "ranked_candidates": ranked_results
+    }
 
 # ==============================================================================
 # 4. API ENDPOINTS
 # ==============================================================================
 
-@app.route('/api/v1/health', methods=['GET'])
+@app.on_event("startup")
+async def start_encode_collator():
+    """Binds the encode batching queue and its collator task to the server loop."""
+    global _server_loop, _encode_queue, _encode_collator
+    _server_loop = asyncio.get_running_loop()
+    _encode_queue = asyncio.Queue()
+    _encode_collator = asyncio.create_task(encode_collator())
+
+@app.get('/api/v1/health')
 def health_check():
     """Liveness probe for the Java ProcessManager."""
+    # Plain 'def': FastAPI runs it in the threadpool, so the blocking ping
+    # never stalls the event loop.
     try:
         es_health = es_client.ping()
     except Exception:
         es_health = False
         
-    return jsonify({
+    return {
         "status": "healthy",
         "service": "nlp_falcon",
         "model": config['embeddings']['model_name'],
         "elasticsearch_connected": es_health
-    })
+    }
 
-@app.route('/api/v1/disambiguate', methods=['POST'])
-def disambiguate():
+@app.post('/api/v1/disambiguate')
+async def disambiguate(request: Request):
     """
     The Main Pipeline [Docs/02_SEMANTIC_LAYER.md].
     Receives: Surface form, Context Window, Candidate QIDs.
     Returns: Ranked Candidates with Semantic Scores.
+    Query: ?mode=fast (default) | accurate (re-score with embeddings.quality_model).
     """
-    
-
     try:
-        payload = request.get_json()
+        # orjson both ways: SIMD parsing/serialization, numpy values encoded natively
+        payload = orjson.loads(await request.body())
         if not payload:
-            raise BadRequest("Empty payload")
+            raise ValueError("Empty payload")
+        mode = request.query_params.get('mode', 'fast')
+        if mode not in ('fast', 'accurate'):
+            raise ValueError(f"Unknown mode: {mode}")
 
-        # 1. Parse Input
-        surface_form = payload.get('surface_form', '')
-        raw_context = payload.get('context_window', [])
-        candidate_ids = payload.get('candidates', [])
-        limit_req = payload.get('limit', 3)
-        
-        # Enforce CPU safety limit [config/nlp/falcon_settings.yaml]
-        max_c = config['thresholds']['max_candidates']
-        process_limit = min(limit_req, max_c)
-        candidates_to_process = candidate_ids[:process_limit]
-
-        if not candidates_to_process:
-            return jsonify({"ranked_candidates": [], "inferred_property": None})
-
-        # 2. Pipeline Phase A: Compression
-        # Remove stopwords to densify the semantic signal
-        clean_context = preprocess_context(raw_context)
-        context_str = " ".join(clean_context)
-        
-        # 3. Pipeline Phase B: Edge Detection (Property Extraction)
-        # Try to find if the context implies a specific property (e.g., "born in")
-        inferred_pid = extract_inferred_property(clean_context)
-
-        # 4. Pipeline Phase C: Vector Scoring
-        # 4a. Fetch Descriptions (The "B" Vectors)
-        descriptions_map = fetch_candidate_descriptions(candidates_to_process)
-        
-        # 4b. Encode "Context" (Vector A)
-        # We augment the context with the surface form for better grounding
-        # e.g. "Paris [SEP] Hilton hotel expensive"
-        input_text = f"{surface_form} {context_str}"
-        vector_a = embedder.encode(input_text, convert_to_tensor=True)
-
-        # 4c. Encode "Candidates" (Vector B) and Calculate Cosine Similarity
-        ranked_results = []
-        
-        for qid in candidates_to_process:
-            desc = descriptions_map.get(qid, "")
-            
-            # Encode Candidate Description
-            # Note: For this version, we calculate on-the-fly to avoid strict dependency 
-            # on pre-calculated vectors in ES, preventing crashes if the index is partial.
-            # "desc or surface_form" ensures we have something to encode.
-            text_to_encode = desc if desc else surface_form
-            vector_b = embedder.encode(text_to_encode, convert_to_tensor=True)
-            
-            # Cosine Similarity
-            score = util.cos_sim(vector_a, vector_b).item()
-            
-            # Normalize to 0-1
-            score = max(0.0, min(1.0, score))
-
-            ranked_results.append({
-                "id": qid,
-                "falcon_score": round(score, 4),
-                # Simple reasoning generation for the UI "Confidence Bar"
-                "semantic_reason": f"Context match: {int(score*100)}%" if score > 0.4 else "Low context overlap"
-            })
-
-        # 5. Sort and Return
-        ranked_results.sort(key=lambda x: x['falcon_score'], reverse=True)
-        
-        return jsonify({
-            "inferred_property": inferred_pid,
-            "ranked_candidates": ranked_results
-        })
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, run_disambiguation, payload, mode)
+        return Response(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
 
     except Exception as e:
         logger.error(f"Disambiguation error: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
+        return JSONResponse({"error": str(e)}, status_code=500)
 
 # ==============================================================================
 # 5. SERVER ENTRY POINT
@@ -265,4 +718,4 @@ if __name__ == '__main__':
     port = config['server']['port']
     
     logger.info(f"Starting SenTient Falcon 2.0 on {host}:{port}")
-    app.run(host=host, port=port, debug=False)
\ No newline at end of file
+    uvicorn.run(app, host=host, port=port, workers=1)
\ No newline at end of file